@@ -0,0 +1,71 @@
+# Compares the throughput of the node position formatting of the exporter
+# against the previous per-float path ('%s' % round(value, 3) for every coordinate).
+#
+# Usage: python benchmarks/bench_format.py [node count]
+
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+
+import fake_bpy
+
+fake_bpy.install()
+
+from io_mesh_jbeam import core
+
+
+def previous_path(part):
+    file = io.StringIO()
+
+    for node_name, (x, y, z) in zip(part.node_names, part.positions.tolist()):
+        file.write('\t\t')
+        file.write('[\"')
+        file.write(node_name)
+        file.write('\",')
+        file.write('%s' % (round(x, 3)))
+        file.write(',')
+        file.write('%s' % (round(y, 3)))
+        file.write(',')
+        file.write('%s' % (round(z, 3)))
+        file.write('],')
+        file.write('\n')
+
+    return file.getvalue()
+
+
+def current_path(part, trim_zeros=True):
+    return ''.join(core.iter_nodes(part, 'jbeam', node_groups=False, trim_zeros=trim_zeros))
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    positions = np.random.default_rng(0).uniform(-2.0, 2.0, (node_count, 3))
+
+    part = core.JBeamPart('bench', positions)
+    part.name_nodes()
+
+    print('%d nodes' % node_count)
+    print('%-32s %10s %14s' % ('path', 'seconds', 'nodes/s'))
+
+    for label, function, args in (('previous (per float round/%s)', previous_path, (part,)),
+                                  ('format_numbers, trimmed', current_path, (part, True)),
+                                  ('format_numbers, fixed', current_path, (part, False))):
+        seconds = measure(function, *args)
+        print('%-32s %10.3f %14.0f' % (label, seconds, node_count / seconds))
+
+
+if __name__ == '__main__':
+    main()
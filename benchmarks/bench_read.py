@@ -0,0 +1,51 @@
+# Measures the JBeam reader (io_mesh_jbeam/reader.py) on files exported from synthetic meshes:
+# parsing time, building the part and the throughput in MB/s.
+#
+# Usage: python benchmarks/bench_read.py [node count]
+
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+
+import fake_bpy
+
+fake_bpy.install()
+
+from io_mesh_jbeam import export_jbeam, reader
+import synthetic
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    context = fake_bpy.make_context()
+
+    print('%-8s %9s %9s %9s %9s %9s' % ('shape', 'nodes', 'MB', 'parse', 'part', 'MB/s'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in sorted(synthetic.SHAPES):
+            obj = synthetic.SHAPES[shape](node_count)
+            settings = export_jbeam.get_export_settings(context, obj)
+            filepath = os.path.join(directory, obj.name)
+            export_jbeam.export_part(export_jbeam.get_jbeam_part(obj, settings), filepath, settings)
+            size = os.path.getsize(filepath) / 1e6
+
+            start = time.perf_counter()
+
+            with open(filepath, 'rt') as jbeam_file:
+                data = reader.parse(jbeam_file)
+
+            parsed = time.perf_counter()
+            part, skipped = reader.get_jbeam_part(*next(iter(data.items())))
+            built = time.perf_counter()
+
+            print('%-8s %9d %9.1f %9.3f %9.3f %9.1f' % (shape, part.node_count, size, parsed - start,
+                                                        built - parsed, size / (built - start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Checks patch mode (io_mesh_jbeam/patch.py) on files exported from synthetic meshes:
+# the mesh is edited, the part is patched into the exported file and the result is compared
+# with what patch mode promises. Raises AssertionError on the first broken check.
+#
+# Usage: python benchmarks/check_patch.py
+
+import os
+import sys
+import tempfile
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+
+import fake_bpy
+
+fake_bpy.install()
+
+from io_mesh_jbeam import export_jbeam, reader
+import synthetic
+
+
+def read_bytes(filepath):
+    with open(filepath, 'rb') as jbeam_file:
+        return jbeam_file.read()
+
+
+def write_bytes(filepath, data):
+    with open(filepath, 'wb') as jbeam_file:
+        jbeam_file.write(data)
+
+
+def export(obj, filepath, context):
+    settings = export_jbeam.get_export_settings(context, obj)
+    export_jbeam.export_part(export_jbeam.get_jbeam_part(obj, settings), filepath, settings)
+
+
+# Exports a grid, moves one vertex and patches the file. Returns the file before and after the patch
+def patch_moved_vertex(directory, line_ending):
+    obj = synthetic.grid(400)
+    filepath = os.path.join(directory, obj.name)
+
+    export(obj, filepath, fake_bpy.make_context())
+    write_bytes(filepath, read_bytes(filepath).replace(b'\n', line_ending))
+    original = read_bytes(filepath)
+
+    obj.data.vertices.attributes['co'][210, 1] += 0.01
+    export(obj, filepath, fake_bpy.make_context(patch_existing=True))
+
+    return original, read_bytes(filepath)
+
+
+def check_line_endings(directory):
+    for line_ending in (b'\n', b'\r\n'):
+        original, patched = patch_moved_vertex(directory, line_ending)
+
+        assert patched != original, 'the moved vertex was not patched'
+
+        if line_ending == b'\r\n':
+            assert patched.count(b'\n') == patched.count(b'\r\n'), 'line endings were changed'
+
+        # Nodes keep their names, only the coordinates of the moved node change
+        changed = [line for line in patched.split(line_ending) if line not in original.split(line_ending)]
+        assert len(changed) == 1, '%d lines changed' % len(changed)
+
+        with open(os.path.join(directory, 'grid.jbeam'), 'rt', newline='') as jbeam_file:
+            reader.parse(jbeam_file)
+
+
+# New beams must not get the properties set by the hand made modifiers at the end of the section
+def check_new_beams(directory):
+    obj = synthetic.grid(400)
+    filepath = os.path.join(directory, obj.name)
+    edges = obj.data.edges.attributes['vertices']
+
+    obj.data.edges = fake_bpy.FakeCollection(len(edges) - 1, vertices=edges[:-1])
+    export(obj, filepath, fake_bpy.make_context())
+
+    with open(filepath, 'rt') as jbeam_file:
+        text = jbeam_file.read()
+
+    beams_end = text.index('\t],\n', text.index('"beams"'))
+    text = text[:beams_end] + '\t\t{"beamSpring":1234},\n' + text[beams_end:]
+
+    with open(filepath, 'wt') as jbeam_file:
+        jbeam_file.write(text)
+
+    obj.data.edges = fake_bpy.FakeCollection(len(edges), vertices=edges)
+    export(obj, filepath, fake_bpy.make_context(patch_existing=True))
+
+    with open(filepath, 'rt') as jbeam_file:
+        beams = reader.parse(jbeam_file)['grid']['beams']
+
+    properties = {}
+
+    for row in beams[1:]:
+        if isinstance(row, dict):
+            properties.update(row)
+        elif properties:
+            raise AssertionError('beam %s gets the properties %s' % (row, properties))
+
+    assert beams[-1] == {'beamSpring': 1234}, 'the hand made modifier was moved'
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for check in (check_line_endings, check_new_beams):
+            check(directory)
+            print('%-24s ok' % check.__name__)
+
+
+if __name__ == '__main__':
+    main()
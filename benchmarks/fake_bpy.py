@@ -0,0 +1,196 @@
+# Minimal stand-ins for bpy, bpy_extras, bmesh and mathutils, just enough to import the addon
+# and run its export pipeline on a plain Python install (no Blender).
+#
+# Call install() before importing io_mesh_jbeam.
+
+import os
+import sys
+import types
+
+import numpy as np
+
+
+def _property(**kwargs):
+    return None
+
+
+class _Anything(object):
+    # Accepts any attribute access or call, used for the parts of bpy the exporter only
+    # touches when registering the addon or drawing the UI
+    def __getattr__(self, name):
+        return _Anything()
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+
+class _Struct(object):
+    pass
+
+
+def _make_bpy():
+    bpy = types.ModuleType('bpy')
+
+    bpy.types = types.ModuleType('bpy.types')
+    for name in ('Operator', 'Menu', 'Panel', 'PropertyGroup', 'AddonPreferences', 'Object', 'Mesh', 'Scene'):
+        setattr(bpy.types, name, type(name, (_Struct,), {}))
+    bpy.types.__getattr__ = lambda name: _Anything()
+
+    bpy.props = types.ModuleType('bpy.props')
+    for name in ('BoolProperty', 'IntProperty', 'FloatProperty', 'StringProperty', 'EnumProperty',
+                 'PointerProperty', 'CollectionProperty'):
+        setattr(bpy.props, name, _property)
+
+    bpy.utils = types.ModuleType('bpy.utils')
+    bpy.utils.register_class = lambda cls: None
+    bpy.utils.unregister_class = lambda cls: None
+
+    bpy.app = types.ModuleType('bpy.app')
+    bpy.app.version = (3, 6, 0)
+    bpy.app.background = True
+    bpy.app.handlers = types.ModuleType('bpy.app.handlers')
+    bpy.app.handlers.persistent = lambda function: function
+    bpy.app.handlers.load_post = []
+    bpy.app.handlers.depsgraph_update_post = []
+    bpy.app.timers = _Anything()
+
+    bpy.path = types.ModuleType('bpy.path')
+    bpy.path.abspath = lambda path: os.path.abspath(path[2:] if path.startswith('//') else path)
+
+    bpy.ops = _Anything()
+    bpy.context = _Anything()
+    bpy.data = _Anything()
+
+    return bpy
+
+
+def install():
+    if 'bpy' in sys.modules:
+        return sys.modules['bpy']
+
+    bpy = _make_bpy()
+    modules = {
+        'bpy': bpy,
+        'bpy.types': bpy.types,
+        'bpy.props': bpy.props,
+        'bpy.utils': bpy.utils,
+        'bpy.app': bpy.app,
+        'bpy.app.handlers': bpy.app.handlers,
+        'bpy.path': bpy.path,
+    }
+
+    for name in ('bmesh', 'mathutils', 'mathutils.kdtree'):
+        module = types.ModuleType(name)
+        module.__getattr__ = lambda attribute: _Anything()
+        modules[name] = module
+
+    bpy_extras = types.ModuleType('bpy_extras')
+    bpy_extras.io_utils = types.ModuleType('bpy_extras.io_utils')
+    bpy_extras.io_utils.ImportHelper = type('ImportHelper', (object,), {})
+    modules['bpy_extras'] = bpy_extras
+    modules['bpy_extras.io_utils'] = bpy_extras.io_utils
+
+    sys.modules.update(modules)
+
+    return bpy
+
+
+class FakeCollection(object):
+    # A bpy_prop_collection like object supporting len() and foreach_get()
+    def __init__(self, count, **attributes):
+        self.count = count
+        self.attributes = attributes
+
+    def __len__(self):
+        return self.count
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = np.asarray(self.attributes[attribute]).ravel()
+
+
+class FakeGroupElement(object):
+    __slots__ = ('group', 'weight')
+
+    def __init__(self, group):
+        self.group = group
+        self.weight = 1.0
+
+
+class FakeVertex(object):
+    __slots__ = ('index', 'groups')
+
+    def __init__(self, index, groups):
+        self.index = index
+        self.groups = groups
+
+
+class FakeVertices(FakeCollection):
+    def __init__(self, positions, group_ids):
+        super().__init__(len(positions), co=positions)
+        self.group_ids = group_ids
+
+    def __iter__(self):
+        for index, group_id in enumerate(self.group_ids.tolist()):
+            yield FakeVertex(index, [FakeGroupElement(group_id)] if group_id != -1 else [])
+
+
+class FakeMesh(object):
+    def __init__(self, name, positions, edges, loop_starts, loop_totals, loop_vertices, group_ids):
+        self.name = name
+        self.vertices = FakeVertices(positions, group_ids)
+        self.edges = FakeCollection(len(edges), vertices=edges)
+        self.polygons = FakeCollection(len(loop_starts), loop_start=loop_starts, loop_total=loop_totals)
+        self.loops = FakeCollection(len(loop_vertices), vertex_index=loop_vertices)
+        self.loop_triangles = FakeCollection(0)
+        self.loop_starts = loop_starts
+        self.loop_totals = loop_totals
+        self.loop_vertices = loop_vertices
+        self.jbeam = types.SimpleNamespace(
+            name=name, value=0, slot_type='main', node_prefix='n', export_information=True,
+            export_value=False, export_nodes=True, export_node_groups=True, export_beams=True,
+            export_face_diagonals=True, export_collision_triangles=True)
+
+    # Fan triangulation of every polygon, like Blender does for quads
+    def calc_loop_triangles(self):
+        polygon_indices = np.repeat(np.arange(len(self.loop_totals)), self.loop_totals - 2)
+        first_loops = np.repeat(self.loop_starts, self.loop_totals - 2)
+        offsets = np.arange(len(polygon_indices)) - np.repeat(np.cumsum(self.loop_totals - 2) -
+                                                                (self.loop_totals - 2), self.loop_totals - 2)
+        loops = np.stack((first_loops, first_loops + offsets + 1, first_loops + offsets + 2), axis=1)
+        triangles = self.loop_vertices[loops]
+
+        self.loop_triangles = FakeCollection(len(triangles), vertices=triangles, polygon_index=polygon_indices)
+
+
+class FakeObject(object):
+    def __init__(self, mesh, group_names=()):
+        self.name = mesh.name
+        self.type = 'MESH'
+        self.mode = 'OBJECT'
+        self.data = mesh
+        self.matrix_world = np.identity(4)
+        self.vertex_groups = [types.SimpleNamespace(name=name) for name in group_names]
+
+    # There are no modifiers, the evaluated object is the object itself
+    def evaluated_get(self, depsgraph):
+        return self
+
+    def to_mesh(self, preserve_all_data_layers=False, depsgraph=None):
+        return self.data
+
+    def to_mesh_clear(self):
+        pass
+
+
+def make_context(**settings):
+    scene_settings = dict(
+        export_path='', export_format='jbeam', backup=False, max_backups=10, backup_path='',
+        write_mode='buffered', incremental_export=False, export_stats=False, patch_existing=False,
+        apply_modifiers=False, watch_mode=False, watch_delay=1.0, background_write=False,
+        export_information=True, export_nodes=True, export_node_groups=True, multi_group_nodes=False,
+        node_precision=3, trim_zeros=True, export_beams=True, export_collision_triangles=True,
+        export_face_diagonals=True, triangulate_ngons=False, author_names='')
+    scene_settings.update(settings)
+
+    return types.SimpleNamespace(scene=types.SimpleNamespace(jbeam=types.SimpleNamespace(**scene_settings)),
+                                 evaluated_depsgraph_get=_Struct)
@@ -0,0 +1,99 @@
+# Headless benchmark of the JBeam export pipeline.
+#
+# Runs the stages of io_mesh_jbeam/export_jbeam.py on synthetic meshes with a fake bpy,
+# prints the time spent per stage and the throughput, and saves everything to JSON
+# so runs can be compared over time.
+#
+# Usage: python benchmarks/run_benchmarks.py [--shapes grid lattice truss] [--sizes 1000 10000 ...]
+#                                           [--write-mode buffered|chunked] [--output results.json]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIRECTORY))
+
+import fake_bpy
+
+fake_bpy.install()
+
+from io_mesh_jbeam import export_jbeam, stats, writers
+import synthetic
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000, 2000000)
+STAGES = tuple(stage for stage in stats.STAGES if stage != 'backup')
+
+
+# Runs export_jbeam.get_jbeam_part() and export_jbeam.export_part() with the exporter's own stage timing
+def run_pipeline(obj, context, directory, write_mode):
+    part_stats = stats.PartStats(obj.name)
+    settings = export_jbeam.get_export_settings(context, obj)._replace(write_mode=write_mode)
+
+    part = export_jbeam.get_jbeam_part(obj, settings, part_stats)
+    export_jbeam.export_part(part, os.path.join(directory, obj.name), settings, part_stats)
+
+    return part, part_stats.stages, part_stats.bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shapes', nargs='+', default=sorted(synthetic.SHAPES), choices=sorted(synthetic.SHAPES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--write-mode', default='buffered', choices=sorted(writers.WRITERS))
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    context = fake_bpy.make_context()
+    results = []
+
+    print('%-8s %9s %9s %9s ' % ('shape', 'nodes', 'beams', 'tris') +
+          ' '.join('%9s' % stage for stage in STAGES) + ' %9s %11s %11s' % ('total', 'nodes/s', 'beams/s'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for shape in args.shapes:
+            for size in args.sizes:
+                obj = synthetic.SHAPES[shape](size)
+                part, times, size_in_bytes = run_pipeline(obj, context, directory, args.write_mode)
+                total = sum(times.values())
+
+                result = {
+                    'shape': shape,
+                    'requested_vertices': size,
+                    'nodes': part.node_count,
+                    'beams': len(part.beams),
+                    'triangles': len(part.triangles),
+                    'bytes': size_in_bytes,
+                    'stages': times,
+                    'total': total,
+                    'nodes_per_second': part.node_count / total,
+                    'beams_per_second': len(part.beams) / total,
+                }
+                results.append(result)
+
+                print('%-8s %9d %9d %9d ' % (shape, part.node_count, len(part.beams), len(part.triangles)) +
+                      ' '.join('%9.3f' % times[stage] for stage in STAGES) +
+                      ' %9.3f %11.0f %11.0f' % (total, result['nodes_per_second'], result['beams_per_second']))
+
+    with open(args.output, 'wt') as output:
+        json.dump({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'write_mode': args.write_mode,
+            'results': results,
+        }, output, indent=2)
+
+    print('Results saved to ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
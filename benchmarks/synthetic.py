@@ -0,0 +1,107 @@
+# Synthetic vehicle-like meshes for the benchmarks, built with NumPy only.
+#
+# Every generator takes an approximate vertex count and returns a FakeObject
+# (see fake_bpy.py) holding the mesh arrays Blender would give to foreach_get.
+
+import numpy as np
+
+from fake_bpy import FakeMesh, FakeObject
+
+GROUP_NAMES = ('chassis', 'door_l', 'door_r', 'hood')
+
+
+def _grid_indices(nx, ny, offset=0):
+    return offset + np.arange(nx * ny).reshape(ny, nx)
+
+
+def _quads(indices):
+    # Quads of a 2D array of vertex indices
+    return np.stack((indices[:-1, :-1], indices[:-1, 1:], indices[1:, 1:], indices[1:, :-1]), axis=-1).reshape(-1, 4)
+
+
+def _quad_edges(indices):
+    return np.concatenate((
+        np.stack((indices[:, :-1], indices[:, 1:]), axis=-1).reshape(-1, 2),
+        np.stack((indices[:-1, :], indices[1:, :]), axis=-1).reshape(-1, 2)))
+
+
+def _assign_groups(count, rng):
+    # About half of the nodes are in a group, like a chassis with a few sub parts
+    group_ids = rng.integers(-1, len(GROUP_NAMES), count)
+    group_ids[rng.random(count) < 0.4] = -1
+    return group_ids
+
+
+def _make_object(name, positions, edges, polygons, rng):
+    polygons = np.asarray(polygons, dtype=np.int64)
+    loop_totals = np.full(len(polygons), polygons.shape[1] if len(polygons) else 0, dtype=np.int64)
+    loop_starts = np.concatenate(([0], np.cumsum(loop_totals)[:-1])) if len(polygons) else loop_totals
+    mesh = FakeMesh(name, positions.astype(np.float32), edges, loop_starts, loop_totals, polygons.ravel(),
+                    _assign_groups(len(positions), rng))
+
+    return FakeObject(mesh, GROUP_NAMES)
+
+
+# Flat quad grid, like a body panel
+def grid(vertex_count, seed=0):
+    rng = np.random.default_rng(seed)
+    side = max(2, int(round(vertex_count ** 0.5)))
+    xs, ys = np.meshgrid(np.linspace(-1.0, 1.0, side), np.linspace(-2.0, 2.0, side))
+    positions = np.stack((xs.ravel(), ys.ravel(), 0.05 * np.sin(xs.ravel() * 3.0)), axis=1)
+    indices = _grid_indices(side, side)
+
+    return _make_object('grid.jbeam', positions, _quad_edges(indices), _quads(indices), rng)
+
+
+# Cubic lattice, beams along the three axes and quads on every XY layer
+def lattice(vertex_count, seed=0):
+    rng = np.random.default_rng(seed)
+    side = max(2, int(round(vertex_count ** (1.0 / 3.0))))
+    axis = np.linspace(-1.0, 1.0, side)
+    xs, ys, zs = np.meshgrid(axis, axis * 2.0, axis * 0.5, indexing='ij')
+    positions = np.stack((xs.ravel(), ys.ravel(), zs.ravel()), axis=1)
+    indices = np.arange(side ** 3).reshape(side, side, side)
+
+    edges = np.concatenate([np.stack((np.take(indices, range(side - 1), axis=a).ravel(),
+                                      np.take(indices, range(1, side), axis=a).ravel()), axis=1)
+                            for a in range(3)])
+    quads = np.concatenate([_quads(indices[:, :, z]) for z in range(side)])
+
+    return _make_object('lattice.jbeam', positions, edges, quads, rng)
+
+
+# Tetrahedral truss: a lattice where every cell gets diagonal beams, with triangle faces
+def truss(vertex_count, seed=0):
+    rng = np.random.default_rng(seed)
+    side = max(2, int(round(vertex_count ** (1.0 / 3.0))))
+    axis = np.linspace(-1.0, 1.0, side)
+    xs, ys, zs = np.meshgrid(axis, axis * 2.0, axis * 0.5, indexing='ij')
+    positions = np.stack((xs.ravel(), ys.ravel(), zs.ravel()), axis=1)
+    positions += rng.normal(0.0, 0.002, positions.shape)
+    indices = np.arange(side ** 3).reshape(side, side, side)
+
+    corner = indices[:-1, :-1, :-1].ravel()
+    dx, dy, dz = side * side, side, 1
+    edges = np.concatenate([
+        np.stack((corner, corner + dx), axis=1),
+        np.stack((corner, corner + dy), axis=1),
+        np.stack((corner, corner + dz), axis=1),
+        np.stack((corner + dx, corner + dy), axis=1),
+        np.stack((corner + dy, corner + dz), axis=1),
+        np.stack((corner + dz, corner + dx), axis=1),
+    ])
+    triangles = np.concatenate([
+        np.stack((corner, corner + dx, corner + dy), axis=1),
+        np.stack((corner, corner + dy, corner + dz), axis=1),
+        np.stack((corner, corner + dz, corner + dx), axis=1),
+        np.stack((corner + dx, corner + dy, corner + dz), axis=1),
+    ])
+
+    return _make_object('truss.jbeam', positions, edges, triangles, rng)
+
+
+SHAPES = {
+    'grid': grid,
+    'lattice': lattice,
+    'truss': truss,
+}
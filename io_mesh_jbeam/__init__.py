@@ -28,7 +28,7 @@ bl_info = {
     "blender": (2, 80, 0),
     "wiki_url": 'http://wiki.beamng.com/Blender_Exporter_plugin',
     "tracker_url": "https://github.com/50thomatoes50/BlenderBeamNGExport/issues",
-    "description": "Export nodes, beams and collision triangles for BeamNG.drive (.jbeam)",
+    "description": "Import and export nodes, beams and collision triangles for BeamNG.drive (.jbeam)",
     "category": "Import-Export"
 }
 
@@ -40,9 +40,15 @@ import bmesh
 from bpy.props import *
 from bpy.utils import *
 from bpy.app.handlers import persistent
+from mathutils.kdtree import KDTree
 from .utils import *
+from .backup import BACKUP_DIRECTORY_NAME
+from . import cache
+from . import stats
 from . import export_jbeam
+from . import import_jbeam
 from . import updater
+from . import watch
 
 for filename in [f for f in os.listdir(os.path.dirname(os.path.realpath(__file__))) if f.endswith(".py")]:
     if filename == os.path.basename(__file__):
@@ -54,12 +60,46 @@ for filename in [f for f in os.listdir(os.path.dirname(os.path.realpath(__file__
         imp.reload(mod)
 
 
+# Edges already connecting two selected BMVerts, as (lower index, higher index) keys.
+# Vertex indices must be up to date (bm.verts.index_update())
+def get_selected_edge_keys(selected_vertices):
+    edge_keys = set()
+
+    for vertex in selected_vertices:
+        for edge in vertex.link_edges:
+            other = edge.other_vert(vertex)
+
+            if other.select and other.index > vertex.index:
+                edge_keys.add((vertex.index, other.index))
+
+    return edge_keys
+
+
 class OBJECT_OT_nodes_connector(bpy.types.Operator):
     bl_idname = 'object.nodes_connector'
     bl_description = 'Create beams/edges between selected nodes/vertices\nBlenderBeamNGExport v.' + print_version()
     bl_label = 'NodesConnector (Previously named `BeamGen`)'
     bl_options = {'REGISTER', 'UNDO'}
 
+    # Every pair of selected vertices gets an edge, so the edge count grows with the square of the selection.
+    # Above the first limit the user has to confirm, above the second the operator refuses to run
+    confirm_vertex_count = 200
+    max_vertex_count = 2000
+
+    @staticmethod
+    def get_selected_vertices(context):
+        if context.edit_object is None or context.edit_object.type != 'MESH':
+            return []
+
+        bm = bmesh.from_edit_mesh(context.edit_object.data)
+        return [vertex for vertex in bm.verts if vertex.select]
+
+    def invoke(self, context, event):
+        if len(self.get_selected_vertices(context)) > self.confirm_vertex_count:
+            return context.window_manager.invoke_confirm(self, event)
+
+        return self.execute(context)
+
     def execute(self, context):
         active_object = context.edit_object
 
@@ -74,12 +114,7 @@ class OBJECT_OT_nodes_connector(bpy.types.Operator):
         #from doc, python manage memory. no need to free manually or else it will crash
         bm = bmesh.from_edit_mesh(active_object.data)
 
-        selected_vertices = [] #array of BMVert
-
-        for vertex in bm.verts:
-            if vertex.select:
-                selected_vertices.append(vertex)
-
+        selected_vertices = self.get_selected_vertices(context) #array of BMVert
         vertex_count = len(selected_vertices)
 
         if vertex_count <= 1:
@@ -87,17 +122,23 @@ class OBJECT_OT_nodes_connector(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='EDIT')
             return {'CANCELLED'}
 
-        edge_created = 0
-        edge_existed = 0
+        if vertex_count > self.max_vertex_count:
+            self.report({'ERROR'}, 'NodesConnector is limited to %d vertices (%d selected, %d edges)' %
+                        (self.max_vertex_count, vertex_count, vertex_count * (vertex_count - 1) // 2))
+            return {'CANCELLED'}
+
+        bm.verts.index_update()
+        selected_vertices.sort(key=lambda vertex: vertex.index)
+
+        existing_edges = get_selected_edge_keys(selected_vertices)
+        new_edges = [(n1, n2) for i, n1 in enumerate(selected_vertices) for n2 in selected_vertices[i + 1:]
+                     if (n1.index, n2.index) not in existing_edges]
 
-        for n1 in selected_vertices:
-            for n2 in selected_vertices:
-                if n1 != n2 and n2.index > n1.index:
-                    if bm.edges.get([n1,n2]) is None: #this already check for edges in the other direction, eg:[n2,n1] would return the same edge
-                        edge_created += 1
-                        bm.edges.new([n1,n2])
-                    else:
-                        edge_existed +=1
+        for n1, n2 in new_edges:
+            bm.edges.new((n1, n2))
+
+        edge_created = len(new_edges)
+        edge_existed = len(existing_edges)
 
         if edge_created > 0:
             bmesh.update_edit_mesh(active_object.data)
@@ -106,11 +147,113 @@ class OBJECT_OT_nodes_connector(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class OBJECT_OT_nodes_proximity_connector(bpy.types.Operator):
+    bl_idname = 'object.nodes_proximity_connector'
+    bl_description = 'Create beams/edges between selected nodes/vertices that are close to each other\n' + \
+                     'BlenderBeamNGExport v.' + print_version()
+    bl_label = 'Proximity NodesConnector'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    mode: bpy.props.EnumProperty(
+        name="Mode",
+        items=(
+            ('RADIUS', "Max Length", "Connect each node to every node closer than the max length"),
+            ('NEAREST', "Nearest", "Connect each node to its nearest nodes")),
+        default='RADIUS')
+    max_length: bpy.props.FloatProperty(
+        name="Max Length",
+        description="Longest beam to create, in world space",
+        default=0.5,
+        min=0.0,
+        subtype='DISTANCE')
+    neighbour_count: bpy.props.IntProperty(
+        name="Neighbours",
+        description="Number of nearest nodes each node is connected to",
+        default=4,
+        min=1,
+        max=64)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'mode')
+
+        if self.mode == 'RADIUS':
+            layout.prop(self, 'max_length')
+        else:
+            layout.prop(self, 'neighbour_count')
+
+    def execute(self, context):
+        active_object = context.edit_object
+
+        if active_object is None or active_object.type != 'MESH':
+            self.report({'ERROR'}, 'Proximity NodesConnector only operates on Meshes in edit mode')
+            return {'CANCELLED'}
+
+        bm = bmesh.from_edit_mesh(active_object.data)
+        bm.verts.index_update()
+
+        selected_vertices = [vertex for vertex in bm.verts if vertex.select]
+        vertex_count = len(selected_vertices)
+
+        if vertex_count <= 1:
+            self.report({'ERROR'}, 'Select more than 1 vertex')
+            return {'CANCELLED'}
+
+        # Beam lengths are measured on the exported (world space) positions
+        matrix_world = active_object.matrix_world
+        positions = [matrix_world @ vertex.co for vertex in selected_vertices]
+
+        kd = KDTree(vertex_count)
+
+        for i, position in enumerate(positions):
+            kd.insert(position, i)
+
+        kd.balance()
+
+        existing_edges = get_selected_edge_keys(selected_vertices)
+        new_edges = set()
+        found_existing_edges = set()
+
+        for i, position in enumerate(positions):
+            if self.mode == 'RADIUS':
+                neighbours = kd.find_range(position, self.max_length)
+            else:
+                # The closest match is the node itself
+                neighbours = kd.find_n(position, self.neighbour_count + 1)
+
+            n1 = selected_vertices[i]
+
+            for _, j, _ in neighbours:
+                if j == i:
+                    continue
+
+                n2 = selected_vertices[j]
+                edge_key = (n1.index, n2.index) if n1.index < n2.index else (n2.index, n1.index)
+
+                if edge_key in existing_edges:
+                    found_existing_edges.add(edge_key)
+                else:
+                    new_edges.add(edge_key)
+
+        bm.verts.ensure_lookup_table()
+
+        for edge_key in sorted(new_edges):
+            bm.edges.new((bm.verts[edge_key[0]], bm.verts[edge_key[1]]))
+
+        if new_edges:
+            bmesh.update_edit_mesh(active_object.data)
+
+        self.report({'INFO'}, 'Proximity NodesConnector created %d edge(s), %d already existed' %
+                    (len(new_edges), len(found_existing_edges)))
+        return {'FINISHED'}
+
+
 class MENU_MT_jbeam_mesh(bpy.types.Menu):
     bl_label = 'JBeam'
 
     def draw(self, context):
         self.layout.operator(OBJECT_OT_nodes_connector.bl_idname)
+        self.layout.operator(OBJECT_OT_nodes_proximity_connector.bl_idname)
 
 
 def menu_func_mesh(self, context):
@@ -132,10 +275,25 @@ class PREFERENCES_PF_jbeam_addon(bpy.types.AddonPreferences):
         subtype='DIR_PATH',
         default=default_export_path,
         update=utils.save_prefs)
+    check_updates_on_startup: bpy.props.BoolProperty(
+        name="Check For Updates On Startup",
+        description="Check for a new version in the background when Blender starts, nothing is installed",
+        default=False,
+        update=utils.save_prefs)
+    update_check_interval: bpy.props.IntProperty(
+        name="Update Check Interval",
+        description="Hours during which the last update check is reused without connecting, " +
+                    "after that only a changed version file is downloaded again",
+        default=24,
+        min=0,
+        max=24 * 30,
+        update=utils.save_prefs)
 
     def draw(self, context):
         layout = self.layout
         layout.prop(self, "default_export_path")
+        layout.prop(self, "check_updates_on_startup")
+        layout.prop(self, "update_check_interval")
 
 
 class MENU_MT_jbeam_export(bpy.types.Menu):
@@ -191,6 +349,10 @@ def menu_func_export(self, context):
     self.layout.menu("MENU_MT_jbeam_export", text='JBeam (.jbeam)')
 
 
+def menu_func_import(self, context):
+    self.layout.operator(import_jbeam.SCRIPT_OT_jbeam_import.bl_idname, text='JBeam (.jbeam)')
+
+
 class PANEL_PT_jbeam_scene(bpy.types.Panel):
     bl_label = "JBeam Exporter"
     bl_space_type = "PROPERTIES"
@@ -213,9 +375,40 @@ class PANEL_PT_jbeam_scene(bpy.types.Panel):
         row = layout.row()
         row.prop(scene.jbeam, "export_format", expand=True)
 
+        row = layout.row()
+        row.prop(scene.jbeam, 'apply_modifiers')
+
+        row = layout.row()
+        row.active = scene.jbeam.export_format == 'jbeam'
+        row.prop(scene.jbeam, 'patch_existing')
+
         row = layout.row()
         row.prop(scene.jbeam, 'backup')
 
+        col = layout.column()
+        col.active = scene.jbeam.backup
+        col.prop(scene.jbeam, 'max_backups')
+        col.prop(scene.jbeam, 'backup_path')
+
+        row = layout.row()
+        row.prop(scene.jbeam, 'write_mode')
+
+        row = layout.row()
+        row.prop(scene.jbeam, 'background_write')
+
+        row = layout.row()
+        row.prop(scene.jbeam, 'incremental_export')
+
+        row = layout.row()
+        row.prop(scene.jbeam, 'export_stats')
+
+        row = layout.row()
+        row.prop(scene.jbeam, 'watch_mode')
+
+        row = layout.row()
+        row.active = scene.jbeam.watch_mode
+        row.prop(scene.jbeam, 'watch_delay')
+
 
 class PANEL_PT_jbeam_scene_information(bpy.types.Panel):
     bl_label = "Information"
@@ -257,6 +450,11 @@ class PANEL_PT_jbeam_scene_nodes(bpy.types.Panel):
 
         col = layout.column()
         col.prop(scene.jbeam, "export_node_groups")
+        sub = col.column()
+        sub.active = scene.jbeam.export_node_groups
+        sub.prop(scene.jbeam, "multi_group_nodes")
+        col.prop(scene.jbeam, "node_precision")
+        col.prop(scene.jbeam, "trim_zeros")
 
 
 class PANEL_PT_jbeam_scene_beams(bpy.types.Panel):
@@ -281,6 +479,10 @@ class PANEL_PT_jbeam_scene_beams(bpy.types.Panel):
         column = flow.column()
         column.prop(scene.jbeam, "export_face_diagonals")
 
+        column = flow.column()
+        column.active = scene.jbeam.export_face_diagonals
+        column.prop(scene.jbeam, "triangulate_ngons")
+
 
 class PANEL_PT_jbeam_scene_collision_triangles(bpy.types.Panel):
     bl_label = "Collision Triangles"
@@ -318,6 +520,10 @@ class PANEL_PT_jbeam_scene_about(bpy.types.Panel):
         row = layout.row()
         row.operator(updater.SCRIPT_OT_jbeam_update.bl_idname, text="Check For Updates", icon="QUESTION")
 
+        if updater.available_version is not None:
+            row = layout.row()
+            row.label(text="Version " + print_version(updater.available_version) + " is available", icon="INFO")
+
         column = layout.column()
         split = column.split()
         sub = split.row()
@@ -510,10 +716,61 @@ class PROPERTIES_PG_jbeam_scene(bpy.types.PropertyGroup):
         items=[("jbeam", "JBeam", "Export as a JBeam file"),
                ("list", "List", "Export as a bare list of nodes, beams and collision triangles"),
                ])
+    apply_modifiers: bpy.props.BoolProperty(
+        name="Apply Modifiers",
+        description="Export the mesh with its modifiers applied (Mirror, Array, ...), the objects are not changed",
+        default=False)
+    patch_existing: bpy.props.BoolProperty(
+        name="Patch Existing Files",
+        description="Only update node positions and add or remove nodes, beams and collision triangles " +
+                    "in existing JBeam files, keeping everything else (properties, other sections, comments)",
+        default=False)
     backup: bpy.props.BoolProperty(
         name="Backup Before Exporting",
         description="Backup the old JBeam file before exporting the new one",
         default=False)
+    max_backups: bpy.props.IntProperty(
+        name="Kept Backups",
+        description="Number of backups kept for every file, older ones are deleted (0 keeps all of them)",
+        default=10,
+        min=0)
+    backup_path: bpy.props.StringProperty(
+        name="Backup Path",
+        description="Where backups are saved, leave empty to use the " + BACKUP_DIRECTORY_NAME +
+                    " folder of the export path",
+        subtype='DIR_PATH',
+        default="")
+    write_mode: bpy.props.EnumProperty(
+        name="Write Mode",
+        items=[("buffered", "Buffered", "Assemble each section in memory and write it at once"),
+               ("chunked", "Streaming", "Write fixed size blocks, keeps memory use low for very large parts"),
+               ])
+    background_write: bpy.props.BoolProperty(
+        name="Write In Background",
+        description="Write the files in the background after reading the meshes, Blender stays responsive " +
+                    "and the results are shown once every file is written",
+        default=True)
+    incremental_export: bpy.props.BoolProperty(
+        name="Skip Unchanged Parts",
+        description="Only export parts whose mesh, transform or JBeam settings changed since the last export " +
+                    "(fingerprints are stored in " + cache.MANIFEST_NAME + " in the export folder)",
+        default=False)
+    watch_mode: bpy.props.BoolProperty(
+        name="Watch Mode",
+        description="Export .jbeam objects again when their geometry or transform changes " +
+                    "(in edit mode, when leaving it), to the export path",
+        default=False)
+    watch_delay: bpy.props.FloatProperty(
+        name="Watch Delay",
+        description="Seconds without changes to wait before exporting, a burst of edits is exported once",
+        default=1.0,
+        min=0.1,
+        max=60.0)
+    export_stats: bpy.props.BoolProperty(
+        name="Export Statistics",
+        description="Time every export stage, print a table to the console and save it to " +
+                    stats.REPORT_NAME + " in the export folder",
+        default=False)
     export_information: bpy.props.BoolProperty(
         name="Information",
         description="Export basic part information",
@@ -526,6 +783,21 @@ class PROPERTIES_PG_jbeam_scene(bpy.types.PropertyGroup):
         name="Node Groups",
         description="Export vertex groups to node groups",
         default=True)
+    multi_group_nodes: bpy.props.BoolProperty(
+        name="Multiple Groups",
+        description="Nodes in several vertex groups get all of them as a group array ({\"group\":[\"a\",\"b\"]}) " +
+                    "instead of only their first group",
+        default=False)
+    node_precision: bpy.props.IntProperty(
+        name="Precision",
+        description="Number of decimals of the exported node positions",
+        default=3,
+        min=2,
+        max=6)
+    trim_zeros: bpy.props.BoolProperty(
+        name="Trim Trailing Zeros",
+        description="Remove the trailing zeros of node positions (1.500 is written as 1.5)",
+        default=True)
     export_beams: bpy.props.BoolProperty(
         name="Beams",
         description="Export edges to beams",
@@ -538,6 +810,10 @@ class PROPERTIES_PG_jbeam_scene(bpy.types.PropertyGroup):
         name="Diagonal Quad Faces",
         description="Edge on quad face (automatic diagonals)",
         default=True)
+    triangulate_ngons: bpy.props.BoolProperty(
+        name="Triangulate Ngons",
+        description="Export the inner edges of triangulated Ngons as diagonals instead of cancelling the export",
+        default=False)
     author_names: bpy.props.StringProperty(
         name="Authors",
         description="Author names")
@@ -592,6 +868,7 @@ class PROPERTIES_PG_jbeam_object(bpy.types.PropertyGroup):
 
 classes = (
     OBJECT_OT_nodes_connector,
+    OBJECT_OT_nodes_proximity_connector,
     MENU_MT_jbeam_mesh,
     MENU_MT_jbeam_export,
     PREFERENCES_PF_jbeam_addon,
@@ -610,6 +887,7 @@ classes = (
     PANEL_PT_jbeam_scene_collision_triangles,
     PANEL_PT_jbeam_scene_about,
     export_jbeam.SCRIPT_OT_jbeam_export,
+    import_jbeam.SCRIPT_OT_jbeam_import,
     updater.SCRIPT_OT_jbeam_update,
     updater.MENU_MT_jbeam_updated
 )
@@ -632,21 +910,28 @@ def register():
 
     bpy.types.VIEW3D_MT_edit_mesh.append(menu_func_mesh)
     bpy.types.TOPBAR_MT_file_export.append(menu_func_export)
+    bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
 
     def make_pointer(prop_type):
         return bpy.props.PointerProperty(name="Jbeam settings", type=prop_type)
 
     bpy.types.Scene.jbeam = make_pointer(PROPERTIES_PG_jbeam_scene)
     bpy.types.Mesh.jbeam = make_pointer(PROPERTIES_PG_jbeam_object)
+    watch.register()
+    updater.register()
     #bpy.app.handlers.load_post.append(load_post_handler)
 
 
 def unregister():
+    updater.unregister()
+    watch.unregister()
+
     for c in reversed(classes):
         bpy.utils.unregister_class(c)
 
     bpy.types.VIEW3D_MT_edit_mesh.remove(menu_func_mesh)
     bpy.types.TOPBAR_MT_file_export.remove(menu_func_export)
+    bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
     del bpy.types.Scene.jbeam
     del bpy.types.Mesh.jbeam
     #bpy.app.handlers.load_post.remove(load_post_handler)
@@ -0,0 +1,88 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Backups of exported files, before they get overwritten.
+# Every file gets its own folder of timestamped backups (<backup directory>/<file name>/),
+# so finding and pruning backups only looks at the backups of that file, whatever
+# the number of files in the export folder. Does not depend on bpy.
+
+import os
+import shutil
+import time
+
+# Default backup directory, relative to the export folder
+BACKUP_DIRECTORY_NAME = 'jbeam_backups'
+
+# Not .jbeam, so BeamNG does not load the backups
+BACKUP_EXTENSION = '.bak'
+
+
+def get_backup_directory(filepath, backup_root=None):
+    directory, filename = os.path.split(filepath)
+
+    if not backup_root:
+        backup_root = os.path.join(directory, BACKUP_DIRECTORY_NAME)
+
+    return os.path.join(backup_root, filename)
+
+
+# Returns the backups of `filepath`, oldest first
+def list_backups(filepath, backup_root=None):
+    backup_directory = get_backup_directory(filepath, backup_root)
+
+    try:
+        names = [name for name in os.listdir(backup_directory) if name.endswith(BACKUP_EXTENSION)]
+    except FileNotFoundError:
+        return []
+
+    # Names start with a sortable timestamp
+    return [os.path.join(backup_directory, name) for name in sorted(names)]
+
+
+# Moves `filepath` to its backup directory with a timestamped name, then deletes the oldest
+# backups so at most `max_backups` are kept (0 keeps all of them).
+# Returns the path of the backup, or None if there was nothing to back up
+def backup_file(filepath, backup_root=None, max_backups=0):
+    if not os.path.isfile(filepath):
+        return None
+
+    backup_directory = get_backup_directory(filepath, backup_root)
+    os.makedirs(backup_directory, exist_ok=True)
+
+    # UTC: local time goes back an hour when daylight saving time ends, names would no longer sort by age
+    now = time.time()
+    timestamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(now)) + '-%06d' % int(now % 1 * 1000000)
+    backup_path = os.path.join(backup_directory, timestamp + BACKUP_EXTENSION)
+
+    # Two backups within the same microsecond, '_' sorts after the extension dot
+    index = 1
+    while os.path.exists(backup_path):
+        backup_path = os.path.join(backup_directory, '%s_%d%s' % (timestamp, index, BACKUP_EXTENSION))
+        index += 1
+
+    shutil.move(filepath, backup_path)
+
+    if max_backups > 0:
+        for old_backup in list_backups(filepath, backup_root)[:-max_backups]:
+            os.remove(old_backup)
+
+    return backup_path
@@ -0,0 +1,94 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Incremental export: remembers a fingerprint of every exported part in a manifest
+# stored in the export folder, so parts that did not change are not written again.
+# Does not depend on bpy.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+MANIFEST_NAME = '.jbeam_export_cache.json'
+
+
+# Returns a hash of everything that ends up in the exported file: the extracted mesh arrays
+# (already transformed to world space), the part properties and the given export settings
+def get_part_fingerprint(part, *settings):
+    digest = hashlib.blake2b(digest_size=16)
+
+    for array in (part.positions, part.group_ids, part.beams, part.triangles):
+        digest.update(repr(array.shape).encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+    information = sorted(part.information.items()) if part.information is not None else None
+    digest.update(repr((part.name, part.group_names, part.group_sets, part.node_prefix, part.decimals, part.slot_type,
+                        information, settings)).encode())
+
+    return digest.hexdigest()
+
+
+class ExportCache(object):
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.directory = directory
+        self.entries = {}
+
+        try:
+            with open(self.path, 'rt') as manifest:
+                self.entries = json.load(manifest)
+        except (OSError, ValueError):
+            # Missing or unreadable manifest, everything gets exported
+            self.entries = {}
+
+    # True if `filename` was exported with this fingerprint and was not modified since
+    def is_current(self, filename, fingerprint):
+        entry = self.entries.get(filename)
+
+        if entry is None or entry.get('fingerprint') != fingerprint:
+            return False
+
+        try:
+            stat = os.stat(os.path.join(self.directory, filename))
+        except OSError:
+            return False
+
+        return stat.st_size == entry.get('size') and stat.st_mtime_ns == entry.get('mtime_ns')
+
+    def update(self, filename, fingerprint):
+        stat = os.stat(os.path.join(self.directory, filename))
+
+        self.entries[filename] = {
+            'fingerprint': fingerprint,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+
+    def save(self):
+        temp_path = self.path + '.tmp'
+
+        with open(temp_path, 'wt') as manifest:
+            json.dump(self.entries, manifest, indent=1, sort_keys=True)
+
+        os.replace(temp_path, self.path)
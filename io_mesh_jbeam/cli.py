@@ -0,0 +1,233 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Headless batch export of many .blend files.
+#
+# The driver runs with any Python 3 (the package itself needs bpy, so this file is run by path, not with -m):
+#     python io_mesh_jbeam/cli.py models/ "vehicles/**/*.blend" --workers 4 --set node_precision=4
+# and starts one background Blender per file:
+#     blender -b --factory-startup file.blend --python io_mesh_jbeam/cli.py -- <worker arguments>
+# Every worker registers the addon from this folder, applies the settings and exports all the .jbeam objects
+# of the scene, like "Export JBeam > Scene". The result is printed as a RESULT_PREFIX line read by the driver.
+# Only the standard library is used on the driver side.
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RESULT_PREFIX = 'JBEAM_BATCH_RESULT '
+
+ADDON_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+# Parses a --set NAME=VALUE argument, VALUE is JSON (numbers, true/false) or else a plain string
+def parse_setting(text):
+    name, separator, value = text.partition('=')
+
+    if not separator or not name:
+        raise argparse.ArgumentTypeError('expected NAME=VALUE, got %r' % text)
+
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+
+    return name.strip(), value
+
+
+# Expands directories (searched recursively), glob patterns and file paths into a sorted list of .blend files
+def find_blend_files(paths):
+    blend_files = set()
+
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(glob.escape(path), '**', '*.blend'), recursive=True)
+        else:
+            matches = glob.glob(path, recursive=True)
+
+        blend_files.update(os.path.abspath(match) for match in matches
+                           if match.endswith('.blend') and os.path.isfile(match))
+
+    return sorted(blend_files)
+
+
+# Returns the export folder of a .blend file, None to use the export path saved in the file.
+# With several input files, every file gets its own sub folder (mirroring the input folders)
+# so parts with the same name don't collide
+def get_output_directory(output, blend_file, blend_files):
+    if not output:
+        return None
+
+    if len(blend_files) == 1:
+        return os.path.abspath(output)
+
+    relative_path = os.path.relpath(blend_file, os.path.commonpath([os.path.dirname(path) for path in blend_files]))
+
+    return os.path.join(os.path.abspath(output), os.path.splitext(relative_path)[0])
+
+
+def run_worker_process(blender, blend_file, worker_arguments, timeout):
+    command = [blender, '--background', '--factory-startup', blend_file,
+               '--python', os.path.abspath(__file__), '--', json.dumps(worker_arguments)]
+    start = time.perf_counter()
+    result = {'file': blend_file, 'status': 'failed', 'parts': 0, 'message': ''}
+
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout,
+                                 universal_newlines=True, errors='replace')
+    except subprocess.TimeoutExpired:
+        result['message'] = 'timed out after %ds' % timeout
+    except OSError as e:
+        result['message'] = 'could not start Blender: %s' % e
+    else:
+        for line in process.stdout.splitlines():
+            if line.startswith(RESULT_PREFIX):
+                result.update(json.loads(line[len(RESULT_PREFIX):]))
+                break
+        else:
+            # Blender crashed or the file could not be opened, keep the end of its output
+            result['message'] = 'exit code %d: %s' % (
+                process.returncode, ' | '.join(process.stdout.strip().splitlines()[-3:]))
+
+    result['seconds'] = time.perf_counter() - start
+
+    return result
+
+
+def print_summary(results, wall_time):
+    width = max([len(os.path.basename(result['file'])) for result in results] + [4])
+
+    print('%-*s %8s %6s %9s  %s' % (width, 'file', 'status', 'parts', 'seconds', 'message'))
+
+    for result in results:
+        print('%-*s %8s %6d %9.2f  %s' % (width, os.path.basename(result['file']), result['status'],
+                                          result['parts'], result['seconds'], result['message']))
+
+    failed = sum(result['status'] == 'failed' for result in results)
+
+    print('%d file(s), %d part(s), %d failed in %.2fs' % (
+        len(results), sum(result['parts'] for result in results), failed, wall_time))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Export the JBeam objects of many .blend files with background Blender processes')
+    parser.add_argument('paths', nargs='+', help='.blend files, folders (searched recursively) or glob patterns')
+    parser.add_argument('-j', '--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='number of Blender processes run at the same time')
+    parser.add_argument('-o', '--output',
+                        help='export folder (one sub folder per .blend file when there are several), '
+                             'defaults to the export path saved in every file')
+    parser.add_argument('-s', '--set', dest='settings', type=parse_setting, action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help='scene export setting, like node_precision=4, export_format=list or '
+                             'incremental_export=true (repeatable)')
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', 'blender'),
+                        help='Blender executable (default: $BLENDER or blender)')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds allowed per file')
+    parser.add_argument('--report', help='also save the results to this JSON file')
+    arguments = parser.parse_args(argv)
+
+    blend_files = find_blend_files(arguments.paths)
+
+    if not blend_files:
+        parser.error('no .blend file found')
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max(1, arguments.workers)) as executor:
+        futures = [executor.submit(run_worker_process, arguments.blender, blend_file, {
+            'settings': dict(arguments.settings),
+            'output': get_output_directory(arguments.output, blend_file, blend_files),
+        }, arguments.timeout) for blend_file in blend_files]
+
+        results = []
+
+        for future in futures:
+            results.append(future.result())
+            print('[%d/%d] %s: %s' % (len(results), len(blend_files), os.path.basename(results[-1]['file']),
+                                      results[-1]['status']), flush=True)
+
+    wall_time = time.perf_counter() - start
+    print_summary(results, wall_time)
+
+    if arguments.report:
+        with open(arguments.report, 'wt') as report:
+            json.dump({'wall_time': wall_time, 'files': results}, report, indent=2)
+
+    # Files without JBeam objects are reported but don't fail the batch
+    return 1 if any(result['status'] == 'failed' for result in results) else 0
+
+
+# Runs inside Blender: exports the .jbeam objects of the open file and prints the result
+def run_worker(worker_arguments):
+    import importlib
+    import bpy
+
+    result = {'status': 'failed', 'parts': 0, 'message': ''}
+
+    try:
+        sys.path.insert(0, os.path.dirname(ADDON_DIRECTORY))
+        addon = importlib.import_module(os.path.basename(ADDON_DIRECTORY))
+
+        if not hasattr(bpy.types.Scene, 'jbeam'):
+            addon.register()
+
+        scene = bpy.context.scene
+
+        for name, value in worker_arguments['settings'].items():
+            if not hasattr(scene.jbeam, name):
+                raise ValueError('unknown setting %r' % name)
+
+            setattr(scene.jbeam, name, value)
+
+        if worker_arguments['output']:
+            os.makedirs(worker_arguments['output'], exist_ok=True)
+            scene.jbeam.export_path = worker_arguments['output']
+
+        result['parts'] = sum(1 for obj in bpy.context.selectable_objects
+                              if obj.type == 'MESH' and '.jbeam' in obj.name)
+
+        if result['parts'] == 0:
+            result['status'] = 'empty'
+            result['message'] = 'no .jbeam object'
+        else:
+            # Error reports of the operator are raised as RuntimeError
+            bpy.ops.script.jbeam_export('EXEC_DEFAULT', export_scene=True)
+            result['status'] = 'ok'
+    except Exception as e:
+        result['parts'] = 0
+        result['message'] = str(e).strip().replace('\n', ' ')
+
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    if '--' in sys.argv:
+        run_worker(json.loads(sys.argv[sys.argv.index('--') + 1]))
+    else:
+        sys.exit(main())
@@ -0,0 +1,401 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Blender independent part of the exporter.
+# Everything in here works on plain Python and NumPy data so it can be used
+# (and profiled) outside of Blender. Do not import bpy from this module.
+
+import collections
+
+import numpy as np
+
+# Default number of decimals kept for node positions
+POSITION_DECIMALS = 3
+
+# Sort key used for nodes without any vertex group, they end up after the grouped ones
+# (or after the last group set if there are more)
+UNGROUPED_SORT_KEY = 255
+
+# Number of nodes, beams or triangles formatted at once when writing
+ROWS_PER_BLOCK = 4096
+
+
+def as_index_array(indices, size):
+    if indices is None:
+        return np.empty((0, size), dtype=np.int64)
+
+    return np.asarray(indices, dtype=np.int64).reshape(-1, size)
+
+
+# Formats a whole column of numbers with `decimals` decimals, returns a list of strings.
+# With `trim_zeros`, trailing zeros are removed but at least one decimal is kept ("1.50" -> "1.5", "2.00" -> "2.0").
+# Values sharing the same number of significant decimals are formatted together with a single map() call
+def format_numbers(values, decimals=POSITION_DECIMALS, trim_zeros=True):
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+
+    if not trim_zeros:
+        return list(map(('%%.%df' % decimals).__mod__, values.tolist()))
+
+    # Count the trailing zeros of the decimal part
+    fractions = np.rint(np.abs(values) * 10 ** decimals).astype(np.int64) % 10 ** decimals
+    trailing_zeros = np.zeros(len(values), dtype=np.int64)
+
+    for i in range(1, decimals):
+        trailing_zeros += fractions % 10 ** i == 0
+
+    kept_decimals = np.maximum(decimals - trailing_zeros, 1)
+    text = np.empty(len(values), dtype=object)
+
+    for kept in range(1, decimals + 1):
+        indices = np.flatnonzero(kept_decimals == kept)
+
+        if len(indices):
+            text[indices] = list(map(('%%.%df' % kept).__mod__, values[indices].tolist()))
+
+    return text.tolist()
+
+
+# Returns the vertex indices of every polygon having exactly `size` vertices, as a (N, size) array
+def get_polygon_vertices(loop_starts, loop_totals, loop_vertices, size):
+    starts = np.asarray(loop_starts)[np.asarray(loop_totals) == size]
+
+    return np.asarray(loop_vertices)[starts[:, np.newaxis] + np.arange(size)]
+
+
+# Returns the two diagonals of every quad (v1-v3 then v2-v4), as a (2 * N, 2) array
+def get_quad_diagonals(quads):
+    quads = as_index_array(quads, 4)
+
+    return np.stack((quads[:, [0, 2]], quads[:, [1, 3]]), axis=1).reshape(-1, 2)
+
+
+# Returns the indices of the polygons having more than 4 vertices
+def find_ngons(loop_totals):
+    return np.flatnonzero(np.asarray(loop_totals) > 4)
+
+
+# Returns the edges of the triangles which are not in `edges` yet, each one once and in order of appearance.
+# Used to get the diagonals of triangulated n-gons
+def get_inner_edges(triangles, edges):
+    triangles = as_index_array(triangles, 3)
+    edges = as_index_array(edges, 2)
+    triangle_edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+
+    if len(triangle_edges) == 0:
+        return triangle_edges
+
+    # One integer key per undirected edge
+    stride = max(triangle_edges.max(), edges.max() if len(edges) else 0) + 1
+    keys = triangle_edges[:, 0] * stride + triangle_edges[:, 1]
+    sorted_edges = np.sort(edges, axis=1)
+    existing_keys = sorted_edges[:, 0] * stride + sorted_edges[:, 1]
+
+    unique_keys, first_indices = np.unique(keys, return_index=True)
+    first_indices = first_indices[~np.isin(unique_keys, existing_keys)]
+
+    return triangle_edges[np.sort(first_indices)]
+
+
+# Builds the group membership of every node from a sparse (vertex, group) table, one entry per vertex group
+# assignment, sorted by vertex. Every distinct combination of groups becomes a group set, a tuple of group indices.
+# Returns the group set index of every node (-1 for nodes without group) and the list of group sets, sorted so that
+# comparing group set indices is the same as comparing the tuples.
+# Without `multi_group` only the first group of every vertex is kept
+def get_group_sets(vertex_indices, group_indices, node_count, multi_group=False):
+    vertex_indices = np.asarray(vertex_indices, dtype=np.int64)
+    group_indices = np.asarray(group_indices, dtype=np.int64)
+    group_ids = np.full(node_count, -1, dtype=np.int64)
+
+    if len(vertex_indices) == 0:
+        return group_ids, []
+
+    if not multi_group:
+        # First entry of every vertex
+        vertices, first_entries = np.unique(vertex_indices, return_index=True)
+        groups = group_indices[first_entries]
+        group_sets, group_ids[vertices] = np.unique(groups, return_inverse=True)
+
+        return group_ids, [(group,) for group in group_sets.tolist()]
+
+    # Entries sorted by vertex then group, without duplicates
+    order = np.lexsort((group_indices, vertex_indices))
+    vertex_indices = vertex_indices[order]
+    group_indices = group_indices[order]
+    unique = np.ones(len(order), dtype=bool)
+    unique[1:] = (vertex_indices[1:] != vertex_indices[:-1]) | (group_indices[1:] != group_indices[:-1])
+    vertex_indices = vertex_indices[unique]
+    group_indices = group_indices[unique]
+
+    vertices, starts, counts = np.unique(vertex_indices, return_index=True, return_counts=True)
+
+    # Most nodes are in a single group, only the others need a tuple built in Python
+    single = counts == 1
+    group_set_keys = [(group,) for group in np.unique(group_indices[starts[single]]).tolist()]
+    multi_group_sets = [tuple(group_indices[start:start + count].tolist())
+                        for start, count in zip(starts[~single].tolist(), counts[~single].tolist())]
+
+    group_sets = sorted(set(group_set_keys).union(multi_group_sets))
+    group_set_ids = {group_set: i for i, group_set in enumerate(group_sets)}
+
+    group_ids[vertices[single]] = [group_set_ids[(group,)] for group in group_indices[starts[single]].tolist()]
+    group_ids[vertices[~single]] = [group_set_ids[group_set] for group_set in multi_group_sets]
+
+    return group_ids, group_sets
+
+
+# Formats indices for error messages, only the first `limit` ones are listed
+def format_indices(indices, limit=10):
+    indices = list(indices)
+    text = ', '.join(str(i) for i in indices[:limit])
+
+    if len(indices) > limit:
+        text += ' (and %d more)' % (len(indices) - limit)
+
+    return text
+
+
+# Export settings of one object: the scene settings combined with the overrides of the object's mesh.
+# Resolved once per object before anything is read or written (export_jbeam.get_export_settings()),
+# every stage reads this instead of the Blender properties. Immutable and picklable.
+# `information` is None or an (authors, name, value) tuple, value being None when it is not exported
+class ExportSettings(collections.namedtuple('ExportSettings', (
+        'export_format', 'nodes', 'node_groups', 'multi_group_nodes', 'node_prefix', 'decimals', 'trim_zeros',
+        'beams', 'face_diagonals', 'triangulate_ngons', 'triangles', 'apply_modifiers', 'slot_type', 'information',
+        'write_mode', 'backup', 'backup_root', 'max_backups', 'patch'), defaults=(
+        'jbeam', True, True, False, 'n', POSITION_DECIMALS, True,
+        True, True, False, True, False, 'main', None,
+        'buffered', False, None, 0, False))):
+    __slots__ = ()
+
+    # Keyword arguments of iter_sections()
+    @property
+    def sections(self):
+        return {
+            'export_format': self.export_format,
+            'nodes': self.nodes,
+            'node_groups': self.node_groups,
+            'beams': self.beams,
+            'triangles': self.triangles,
+            'trim_zeros': self.trim_zeros,
+        }
+
+
+
+class JBeamPart(object):
+    # A JBeam part stored as columns: one row per node, beam and triangle.
+    # Beams and triangles hold node indices (rows of `positions`).
+    def __init__(self, name, positions, group_ids=None, group_names=(), beams=None, triangles=None,
+                 node_prefix='n', decimals=POSITION_DECIMALS, group_sets=None):
+        self.name = name
+        # Positions are rounded once here, sorting and naming work on the exported values
+        self.decimals = decimals
+        self.positions = np.round(np.asarray(positions, dtype=np.float64).reshape(-1, 3), decimals)
+
+        if group_ids is None:
+            self.group_ids = np.full(len(self.positions), -1, dtype=np.int64)
+        else:
+            self.group_ids = np.asarray(group_ids, dtype=np.int64)
+
+        # Group index -> group name
+        self.group_names = list(group_names)
+        # Group set index (`group_ids`, -1 for nodes without group) -> tuple of group indices.
+        # Defaults to one set per group, `group_ids` then holds group indices
+        if group_sets is None:
+            self.group_sets = [(i,) for i in range(len(self.group_names))]
+        else:
+            self.group_sets = [tuple(group_set) for group_set in group_sets]
+        self.beams = as_index_array(beams, 2)
+        self.triangles = as_index_array(triangles, 3)
+        self.node_prefix = node_prefix
+        self.node_names = []
+
+        # Only used by the jbeam format
+        self.slot_type = 'main'
+        # None, or a dictionary with 'authors', 'name' and optionally 'value'
+        self.information = None
+
+    @property
+    def node_count(self):
+        return len(self.positions)
+
+    # JSON value of a "group" entry: a string for one group, an array for several
+    def get_group_value(self, group_id):
+        if group_id == -1:
+            return '""'
+
+        names = ['"%s"' % self.group_names[group] for group in self.group_sets[group_id]]
+
+        return names[0] if len(names) == 1 else '[' + ','.join(names) + ']'
+
+    # Sorts nodes by vertex group, then Y axis, then -X axis, then Z axis.
+    # Nodes with equal keys keep their original order (lexsort is stable).
+    # Beams and triangles are remapped to the new node indices.
+    # Returns the applied order (old node index of every new node)
+    def sort_nodes(self):
+        group_keys = np.where(self.group_ids == -1, max(UNGROUPED_SORT_KEY, len(self.group_sets)), self.group_ids)
+
+        # The last key is the primary one
+        order = np.lexsort((self.positions[:, 2], -self.positions[:, 0], self.positions[:, 1], group_keys))
+
+        self.reorder_nodes(order)
+
+        return order
+
+    def reorder_nodes(self, order):
+        # Inverse of the order: old node index -> new node index
+        new_index = np.empty(len(order), dtype=np.int64)
+        new_index[order] = np.arange(len(order))
+
+        self.positions = self.positions[order]
+        self.group_ids = self.group_ids[order]
+        self.beams = new_index[self.beams]
+        self.triangles = new_index[self.triangles]
+
+        if self.node_names:
+            self.node_names = [self.node_names[i] for i in order.tolist()]
+
+    # Names nodes from their index and side: left (X > 0), right (X < 0) or center
+    def name_nodes(self):
+        xs = self.positions[:, 0]
+        sides = np.where(xs > 0, 'l', np.where(xs < 0, 'r', '')).tolist()
+
+        self.node_names = [self.node_prefix + side + str(i) for i, side in enumerate(sides)]
+
+
+def iter_header(part):
+    yield '{\n"%s":{\n' % part.name
+
+    if part.information is not None:
+        yield '\t"information":{\n' \
+              '\t\t"authors":"%s",\n' \
+              '\t\t"name":"%s",\n' % (part.information['authors'], part.information['name'])
+
+        if part.information.get('value') is not None:
+            yield '\t\t"value":%s,\n' % part.information['value']
+
+        yield '\t},\n'
+
+    yield '\t"slotType":"%s",\n' % part.slot_type
+
+
+# Yields the rows of an array in blocks of ROWS_PER_BLOCK rows converted to Python lists,
+# so huge parts never get converted to a single giant list at once
+def iter_row_blocks(array):
+    for start in range(0, len(array), ROWS_PER_BLOCK):
+        yield array[start:start + ROWS_PER_BLOCK].tolist()
+
+
+def iter_nodes(part, export_format='jbeam', node_groups=True, trim_zeros=True):
+    indent = '\t\t' if export_format == 'jbeam' else ''
+    line = indent + '["%s",%s,%s,%s],\n'
+    group_line = indent + '{"group":%s},\n'
+
+    yield '//--Nodes--\n'
+
+    if export_format == 'jbeam':
+        yield '\t"nodes":[\n\t\t["id", "posX", "posY", "posZ"],\n'
+
+    current_group_id = -2
+    group_count = 0
+
+    for start in range(0, part.node_count, ROWS_PER_BLOCK):
+        stop = start + ROWS_PER_BLOCK
+        xs, ys, zs = (format_numbers(part.positions[start:stop, axis], part.decimals, trim_zeros)
+                      for axis in range(3))
+        lines = []
+
+        for node_name, x, y, z, group_id in zip(part.node_names[start:stop], xs, ys, zs,
+                                                part.group_ids[start:stop].tolist()):
+            if current_group_id != group_id:
+                current_group_id = group_id
+
+                if current_group_id != -1:
+                    group_count += 1
+
+                if node_groups:
+                    lines.append(group_line % (
+                        part.get_group_value(current_group_id) if group_count != 0 else '"%s"' % part.name))
+
+            lines.append(line % (node_name, x, y, z))
+
+        yield ''.join(lines)
+
+    if current_group_id != -1 or group_count == 0:
+        yield group_line % '""'
+
+    if export_format == 'jbeam':
+        yield '\t],\n'
+
+
+def iter_beams(part, export_format='jbeam'):
+    line = '\t\t["%s","%s"],\n' if export_format == 'jbeam' else '["%s","%s"],\n'
+    node_names = part.node_names
+
+    yield '//--Beams--\n'
+
+    if export_format == 'jbeam':
+        yield '\t"beams":[\n\t\t["id1:", "id2:"],\n'
+
+    for beams in iter_row_blocks(part.beams):
+        yield ''.join([line % (node_names[node_index1], node_names[node_index2])
+                       for node_index1, node_index2 in beams])
+
+    if export_format == 'jbeam':
+        yield '\t],\n'
+
+
+def iter_triangles(part, export_format='jbeam'):
+    line = '\t\t["%s","%s","%s"],\n' if export_format == 'jbeam' else '["%s","%s","%s"],\n'
+    node_names = part.node_names
+
+    yield '//--Collision Triangles--\n'
+
+    if export_format == 'jbeam':
+        yield '\t"triangles":[\n\t\t["id1:", "id2:", "id3:"],\n'
+
+    for triangles in iter_row_blocks(part.triangles):
+        yield ''.join([line % (node_names[node_index1], node_names[node_index2], node_names[node_index3])
+                       for node_index1, node_index2, node_index3 in triangles])
+
+    if export_format == 'jbeam':
+        yield '\t],\n'
+
+
+# Yields the sections of a JBeam (or list) file for the given part.
+# Every section is itself an iterable of text blocks, see writers.py to write them
+def iter_sections(part, export_format='jbeam', nodes=True, node_groups=True, beams=True, triangles=True,
+                  trim_zeros=True):
+    if export_format == 'jbeam':
+        yield iter_header(part)
+
+    if nodes:
+        yield iter_nodes(part, export_format, node_groups, trim_zeros)
+
+    if beams:
+        yield iter_beams(part, export_format)
+
+    if triangles:
+        yield iter_triangles(part, export_format)
+
+    if export_format == 'jbeam':
+        yield ('},\n}',)
+
@@ -20,441 +20,526 @@
 
 # <pep8-80 compliant>
 
+import contextlib
+import functools
 import os
 import bpy
+import numpy as np
 from bpy import ops
+from concurrent.futures import ThreadPoolExecutor
 
 from .utils import *
+from . import cache
+from .backup import backup_file
+from .stats import NO_STATS, ExportStats
+from . import core
+from . import patch
+from . import writers
 
 
-class NGnode(object):
-    def __init__(self, id_, node_name, groups, x, y, z):
-        self.id_ = id_
-        self.node_name = node_name
-        self.groups = groups
-        self.x = x
-        self.y = y
-        self.z = z
+def get_vertex_positions(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
 
+    return co.reshape(-1, 3).astype(np.float64)
 
-class SCRIPT_OT_jbeam_export(bpy.types.Operator):
-    bl_idname = 'script.jbeam_export'
-    bl_description = 'Export for use in BeamNG.drive (.jbeam)'
-    bl_label = 'Export JBeam'
 
-    filepath: bpy.props.StringProperty(
-        name="File Path",
-        description="File path used for exporting the JBeam file",
-        maxlen=1024, default="")
+# Returns the vertex positions of the mesh transformed by the object's world matrix.
+# matrix_world already contains the object's delta transforms (delta_location, ...)
+def get_world_positions(obj, mesh):
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
 
-    export_scene: bpy.props.BoolProperty(
-        name="scene_export",
-        description="exporter_prop_scene_tip",
-        default=False,
-        options={'HIDDEN'})
+    return get_vertex_positions(mesh) @ matrix[:3, :3].T + matrix[:3, 3]
 
-    def invoke(self, context, event):
-        ops.wm.call_menu(name="MENU_MT_jbeam_export")
-        return {'PASS_THROUGH'}
 
-    def execute(self, context):
-        import sys
-        jbeam_file = None
-        scene = context.collection
-        active_object = context.active_object
+def get_edge_vertices(mesh):
+    vertices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', vertices)
 
-        export_objects = []
-        if self.export_scene:
-            for selectable_object in bpy.context.selectable_objects:
-                if selectable_object.type == 'MESH':
-                    if '.jbeam' in selectable_object.name:
-                        export_objects.append(selectable_object)
+    return vertices.reshape(-1, 2)
 
-        else:
-            for selected_object in context.selected_objects:
-                if selected_object.type == 'MESH':
-                    export_objects.append(selected_object)
 
-        export_objects_count = len(export_objects)
+# Returns the loop_start and loop_total of every polygon and the vertex index of every loop
+def get_polygon_loops(mesh):
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
 
-        if export_objects_count == 0:
-            self.report({'ERROR'}, 'ERROR : At least one object must be selected to export')
-            return {'CANCELLED'}
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    mesh.loops.foreach_get('vertex_index', loop_vertices)
 
-        temp_mesh = None
-        temp_object = None
+    return loop_starts, loop_totals, loop_vertices
 
-        try:
-            for export_object in export_objects:
-                # Make the active object be the selected one
-                bpy.context.view_layer.objects.active = export_object
-                # Want to be in Object mode
-                bpy.ops.object.mode_set(mode='OBJECT')
-
-                # -------------------------------------
-                # Create a copy of the selected object
-                # -------------------------------------
-
-                temp_name = export_object.name + '.JBEAM_TEMP'
-
-                # Create new mesh
-                temp_mesh = bpy.data.meshes.new(temp_name)
-
-                # Create new object associated with the mesh
-                temp_object = bpy.data.objects.new(temp_name, temp_mesh)
-
-                # Copy data block from the old object into the new object
-                temp_object.data = export_object.data.copy()
-                temp_object.scale = export_object.scale
-                temp_object.location = export_object.location
-                temp_object.rotation_axis_angle = export_object.rotation_axis_angle
-                temp_object.rotation_euler = export_object.rotation_euler
-                temp_object.rotation_mode = export_object.rotation_mode
-                temp_object.rotation_quaternion = export_object.rotation_quaternion
-
-                # Link new object to the given scene, select it, and make it active
-                scene.objects.link(temp_object)
-                temp_object.select_set(True)
-                bpy.context.view_layer.objects.active = temp_object
-
-                # Apply transforms
-                bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
-
-                # TODO: Can we copy modifiers from original object and then do this?
-                # mesh = ob_new.to_mesh(scene, True, 'PREVIEW')
-
-                # Sort vertices
-                mesh = temp_object.data
-                nodes = []
-                for vertex in mesh.vertices:
-                    node = NGnode(vertex.index,
-                                  export_object.data.jbeam.node_prefix,
-                                  vertex.groups,
-                                  round(vertex.co[0] + export_object.delta_location[0], 3),
-                                  round(vertex.co[1] + export_object.delta_location[1], 3),
-                                  round(vertex.co[2] + export_object.delta_location[2], 3))
-                    nodes.append(node)
-
-                # sorted_z is nodes sorted by Z axis
-                sorted_z = sorted(nodes, key=lambda NGnode: NGnode.z)
-
-                # sorted_x is sorted_z sorted by -X axis
-                sorted_x = sorted(sorted_z, key=lambda NGnode: NGnode.x, reverse=True)
-
-                # sorted_nodes is sorted_x sorted by Y axis
-                sorted_nodes = sorted(sorted_x, key=lambda NGnode: NGnode.y)
-
-                # sorted_nodes is nodes sorted by Z axis then -X axis then Y axis?
-                sorted_nodes = sorted(sorted_nodes, key=lambda NGnode: (
-                    0 in NGnode.groups.keys(), NGnode.groups[0].group if len(NGnode.groups) > 0 else 255))
-
-                # This dictionary is computed once, rather than every time we need to find the index of a node
-                sorted_node_idx = {node.id_: i for i, node in enumerate(sorted_nodes)}
-
-
-                # Export
-                new_line = '\n'
-
-                if '.jbeam' in export_object.name:
-                    filename = export_object.name
-                else:
-                    filename = export_object.name + '.jbeam'
 
-                print("Exporting JBeam file: " + str(self.filepath) + filename)
+# Returns the triangulation Blender already uses to draw the mesh, as a (N, 3) array of vertex indices,
+# and the index of the polygon every triangle comes from
+def get_loop_triangles(mesh):
+    mesh.calc_loop_triangles()
 
-                if self.filepath == "":
-                    if context.scene.jbeam.export_path == "":
-                        bpy.context.view_layer.objects.active = active_object
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    polygon_indices = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+    mesh.loop_triangles.foreach_get('polygon_index', polygon_indices)
 
-                        if temp_object:
-                            scene.objects.unlink(temp_object)
-                            bpy.data.objects.remove(temp_object)
+    return triangles.reshape(-1, 3), polygon_indices
 
-                        self.report({'ERROR'},
-                                    'No export folder set. Go to Scene > JBeam Exporter.')
 
-                        return {'CANCELLED'}
+def get_ngons(mesh):
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
 
-                    if context.scene.jbeam.export_path.startswith("//") and not context.blend_data.filepath:
-                        if temp_object:
-                            scene.objects.unlink(temp_object)
-                            bpy.data.objects.remove(temp_object)
+    return core.find_ngons(loop_totals)
 
-                        self.report({'ERROR'}, "Save the .blend file first.")
-                        return {'CANCELLED'}
-                    self.filepath = context.scene.jbeam.export_path
 
-                if context.scene.jbeam.export_path.startswith("//"):
-                    self.filepath = bpy.path.abspath(context.scene.jbeam.export_path)
-                elif self.filepath == "" or self.filepath.startswith("//") :
-                    self.filepath = bpy.path.abspath(self.filepath)
+def get_part_name(obj):
+    if '.jbeam' in obj.name:
+        return obj.name[0:len(obj.name) - 6]
+    else:
+        return obj.name
 
-                if not (os.path.isdir(self.filepath)):
-                    # Creates the path if it doesn't exists
-                    # useful if the default BeamNG mod directory doesn't exist
-                    try:
-                        os.makedirs(self.filepath, exist_ok=True)
-                    except Exception as e:
-                        print(e)
-                        self.report({'ERROR'}, 'ERROR : Could not create export directories')
-                        return {'CANCELLED'}
 
-                # If the file already exists
-                if context.scene.jbeam.backup and os.path.isfile(self.filepath + filename):
-                    # Count the number of times there are original + backup files
-                    jbeam_file_count = len([f for f in os.listdir(self.filepath)
-                                            if filename in f and os.path.isfile(os.path.join(self.filepath, f))])
+# Resolves the scene settings and the overrides of the object's mesh into one immutable core.ExportSettings
+def get_export_settings(context, obj):
+    scene = context.scene.jbeam
+    mesh = obj.data
+    information = None
 
-                    # Backup the original file
-                    os.rename(self.filepath + filename, self.filepath + filename + str(jbeam_file_count))
+    if scene.export_information and mesh.jbeam.export_information:
+        authors = 'Blender JBeam Exporter v' + print_version()
 
-                jbeam_file = open(self.filepath + filename, 'wt')
+        if scene.author_names and len(scene.author_names) > 0:
+            authors = scene.author_names + ", " + authors
 
-                if '.jbeam' in export_object.name:
-                    name = export_object.name[0:len(export_object.name) - 6]
-                else:
-                    name = export_object.name
+        information = (authors, mesh.jbeam.name, mesh.jbeam.value if mesh.jbeam.export_value else None)
 
-                if context.scene.jbeam.export_format == 'jbeam':
-                    authors = 'Blender JBeam Exporter v' + print_version()
+    return core.ExportSettings(
+        export_format=scene.export_format,
+        nodes=scene.export_nodes and mesh.jbeam.export_nodes,
+        node_groups=scene.export_node_groups and mesh.jbeam.export_node_groups,
+        multi_group_nodes=scene.multi_group_nodes,
+        node_prefix=mesh.jbeam.node_prefix,
+        decimals=scene.node_precision,
+        trim_zeros=scene.trim_zeros,
+        beams=scene.export_beams and mesh.jbeam.export_beams,
+        face_diagonals=scene.export_face_diagonals and mesh.jbeam.export_face_diagonals,
+        triangulate_ngons=scene.triangulate_ngons,
+        triangles=scene.export_collision_triangles and mesh.jbeam.export_collision_triangles,
+        apply_modifiers=scene.apply_modifiers,
+        slot_type=mesh.jbeam.slot_type,
+        information=information,
+        write_mode=scene.write_mode,
+        backup=scene.backup,
+        backup_root=bpy.path.abspath(scene.backup_path) if scene.backup_path else None,
+        max_backups=scene.max_backups,
+        patch=scene.patch_existing and scene.export_format == 'jbeam')
 
-                    if context.scene.jbeam.author_names and len(context.scene.jbeam.author_names) > 0:
-                        authors = context.scene.jbeam.author_names + ", " + authors
 
-                    jbeam_file.write('{\n"%s":{\n' % name)
+# Yields the mesh to export: the object's own mesh, or with a depsgraph, a temporary copy of the evaluated mesh
+# (modifiers, shape keys and hooks applied) which is freed on exit. The copy keeps all the data layers of the mesh,
+# without them to_mesh() drops the vertex groups and attributes the nodes are read from
+@contextlib.contextmanager
+def get_export_mesh(obj, depsgraph=None, part_stats=NO_STATS):
+    if depsgraph is None:
+        yield obj.data
+        return
 
-                    if context.scene.jbeam.export_information and export_object.data.jbeam.export_information:
-                        jbeam_file.write(
-                            '\t"information":{\n'
-                            '\t\t"authors":"%s",\n'
-                            '\t\t"name":"%s",\n' % (
-                                authors,
-                                export_object.data.jbeam.name))
+    evaluated_object = obj.evaluated_get(depsgraph)
 
-                        if export_object.data.jbeam.export_value:
-                            jbeam_file.write('\t\t"value":%s,\n' % export_object.data.jbeam.value)
+    with part_stats.stage('extract'):
+        mesh = evaluated_object.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
 
-                        jbeam_file.write('\t},\n')
+    try:
+        yield mesh
+    finally:
+        evaluated_object.to_mesh_clear()
 
-                    jbeam_file.write('\t"slotType":"%s",\n' % export_object.data.jbeam.slot_type)
 
-                mesh.update(calc_edges=True, calc_edges_loose=True)
+# Reads the mesh data of the object into a core.JBeamPart.
+# With a depsgraph the evaluated mesh is read (see get_export_mesh()).
+# With `settings.triangulate_ngons`, n-gons get the inner edges of their triangulation as diagonals
+def get_jbeam_part(obj, settings, part_stats=NO_STATS, depsgraph=None):
+    with get_export_mesh(obj, depsgraph, part_stats) as mesh:
+        return get_mesh_part(obj, mesh, settings, part_stats)
 
-                i = 0
 
-                if context.scene.jbeam.export_nodes and context.active_object.data.jbeam.export_nodes:
-                    jbeam_file.write('//--Nodes--')
-                    jbeam_file.write(new_line)
+def get_mesh_part(obj, mesh, settings, part_stats=NO_STATS):
+    loop_triangles = None
 
-                    if context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t"nodes":[\n\t\t["id", "posX", "posY", "posZ"],\n')
-
-                current_node_group_index = -2
-                vertex_group_count = 0
-
-                for vertex in sorted_nodes:
-                    if current_node_group_index != get_vertex_group_id(vertex.groups):
-                        current_node_group_index = get_vertex_group_id(vertex.groups)
-
-                        if current_node_group_index != -1:
-                            vertex_group_count += 1
-
-                        if context.scene.jbeam.export_node_groups and export_object.data.jbeam.export_node_groups:
-                            if context.scene.jbeam.export_nodes and export_object.data.jbeam.export_nodes:
-                                if context.scene.jbeam.export_format == 'jbeam':
-                                    jbeam_file.write('\t\t')
+    with part_stats.stage('extract'):
+        vertex_indices, group_indices = get_vertex_group_table(obj, mesh)
+        group_ids, group_sets = core.get_group_sets(vertex_indices, group_indices, len(mesh.vertices),
+                                                    settings.multi_group_nodes)
 
-                                vertex_group_name = get_vertex_group_name(export_object, vertex.groups)
+        part = core.JBeamPart(get_part_name(obj),
+                              get_world_positions(obj, mesh),
+                              group_ids=group_ids,
+                              group_names=[group.name for group in obj.vertex_groups],
+                              node_prefix=settings.node_prefix,
+                              decimals=settings.decimals,
+                              group_sets=group_sets)
 
-                                jbeam_file.write(
-                                    '{"group":"%s"},\n' % (vertex_group_name if vertex_group_count != 0 else name))
+    if settings.beams:
+        with part_stats.stage('beams'):
+            part.beams = get_edge_vertices(mesh)
 
-                    if context.scene.jbeam.export_nodes and context.active_object.data.jbeam.export_nodes and context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t\t')
+        if settings.face_diagonals:
+            with part_stats.stage('diagonals'):
+                loop_starts, loop_totals, loop_vertices = get_polygon_loops(mesh)
+                quads = core.get_polygon_vertices(loop_starts, loop_totals, loop_vertices, 4)
+                diagonals = [part.beams, core.get_quad_diagonals(quads)]
 
-                    if context.scene.jbeam.export_nodes and context.active_object.data.jbeam.export_nodes:
-                        jbeam_file.write('[\"')
+                if settings.triangulate_ngons and len(core.find_ngons(loop_totals)):
+                    loop_triangles, polygon_indices = get_loop_triangles(mesh)
+                    ngon_triangles = loop_triangles[loop_totals[polygon_indices] > 4]
+                    diagonals.append(core.get_inner_edges(ngon_triangles, part.beams))
 
-                    if vertex.x > 0:
-                        vertex.node_name = vertex.node_name + 'l' + ('%s' % i)
-                    elif vertex.x < 0:
-                        vertex.node_name = vertex.node_name + 'r' + ('%s' % i)
-                    else:
-                        vertex.node_name = vertex.node_name + ('%s' % i)
+                part.beams = np.concatenate(diagonals)
 
-                    if context.scene.jbeam.export_nodes and context.active_object.data.jbeam.export_nodes:
-                        jbeam_file.write(vertex.node_name)
-                        jbeam_file.write('\",')
-                        jbeam_file.write('%s' % (round(vertex.x + export_object.delta_location[0], 3)))
-                        jbeam_file.write(',')
-                        jbeam_file.write('%s' % (round(vertex.y + export_object.delta_location[1], 3)))
-                        jbeam_file.write(',')
-                        jbeam_file.write('%s' % (round(vertex.z + export_object.delta_location[2], 3)))
-                        jbeam_file.write('],')
+    if settings.triangles:
+        with part_stats.stage('triangles'):
+            if loop_triangles is None:
+                loop_triangles, polygon_indices = get_loop_triangles(mesh)
 
-                    if context.scene.jbeam.export_nodes and context.active_object.data.jbeam.export_nodes:
-                        # to debug groups
-                        # jbeam_file.write('//grp[%d]="%s"' % (get_vertex_group_id(vertex.groups), get_vertex_group_name(vertex.groups)) )
-                        jbeam_file.write(new_line)
-
-                    i += 1
+            part.triangles = loop_triangles
 
-                if context.scene.jbeam.export_nodes and context.active_object.data.jbeam.export_nodes:
-                    if current_node_group_index != -1 or vertex_group_count == 0:
-                        if context.scene.jbeam.export_format == 'jbeam':
-                            jbeam_file.write('\t\t')
+    part.slot_type = settings.slot_type
 
-                        jbeam_file.write('{"group":""},\n')
+    if settings.information is not None:
+        authors, name, value = settings.information
+        part.information = {
+            'authors': authors,
+            'name': name,
+            'value': value
+        }
 
-                    if context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t],\n')
+    part_stats.count(part)
 
-                if context.scene.jbeam.export_beams and context.active_object.data.jbeam.export_nodes:
-                    jbeam_file.write('//--Beams--')
-                    jbeam_file.write(new_line)
+    return part
 
-                    if context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t"beams":[\n\t\t["id1:", "id2:"],\n')
 
-                    for edge in mesh.edges:
-                        if context.scene.jbeam.export_format == 'list':
-                            jbeam_file.write('[\"')
-                        else:
-                            jbeam_file.write('\t\t[\"')
+def backup_part(filepath, settings, part_stats=NO_STATS):
+    if settings.backup:
+        with part_stats.stage('backup'):
+            backup_file(filepath, settings.backup_root, settings.max_backups)
 
-                        v1, v2 = edge.vertices
-                        node_index1 = sorted_node_idx[v1]
-                        jbeam_file.write('%s\"' % sorted_nodes[node_index1].node_name)
-                        jbeam_file.write(',')
-                        node_index2 = sorted_node_idx[v2]
-                        jbeam_file.write('\"%s\"' % sorted_nodes[node_index2].node_name)
-                        jbeam_file.write('],')
-                        jbeam_file.write(new_line)
 
-                    if context.scene.jbeam.export_face_diagonals and context.active_object.data.jbeam.export_face_diagonals:
-                        for face in mesh.polygons:
-                            vertices = face.vertices
+# Sorts, names and writes the part to `filepath`.
+# With `settings.patch`, an existing file containing the part is patched in place (see patch.py).
+# Does not touch bpy, so it can run in a worker thread. Returns the number of characters written,
+# or the number of changed rows when the file was patched
+def export_part(part, filepath, settings, part_stats=NO_STATS):
+    with part_stats.stage('sort'):
+        part.sort_nodes()
 
-                            if len(vertices) == 4:
-                                v1, v2, v3, v4 = vertices
-                                node_index1 = sorted_node_idx[v1]
-                                node_index2 = sorted_node_idx[v2]
-                                node_index3 = sorted_node_idx[v3]
-                                node_index4 = sorted_node_idx[v4]
+    with part_stats.stage('name'):
+        part.name_nodes()
 
-                                if context.scene.jbeam.export_format == 'list':
-                                    jbeam_file.write('["%s","%s"],\n' % (
-                                        sorted_nodes[node_index1].node_name, sorted_nodes[node_index3].node_name))
-                                    jbeam_file.write('["%s","%s"],\n' % (
-                                        sorted_nodes[node_index2].node_name, sorted_nodes[node_index4].node_name))
-                                else:
-                                    jbeam_file.write('\t\t["%s","%s"],\n' % (
-                                        sorted_nodes[node_index1].node_name, sorted_nodes[node_index3].node_name))
-                                    jbeam_file.write('\t\t["%s","%s"],\n' % (
-                                        sorted_nodes[node_index2].node_name, sorted_nodes[node_index4].node_name))
+    if settings.patch and os.path.isfile(filepath):
+        print("Patching JBeam file: " + filepath)
 
-                            elif len(vertices) > 4:
-                                self.report({'ERROR'},
-                                            'ERROR: Mesh contains Ngons, only triangles and quads are supported.')
+        # The backup is made once the patched file is ready, its time is part of the write stage
+        with part_stats.stage('write'):
+            changes = patch.patch_file(part, filepath, settings, lambda: backup_part(filepath, settings))
 
-                                if jbeam_file:
-                                    jbeam_file.close()
+        if changes is not None:
+            print("    " + (', '.join('%d %s' % (count, change) for change, count in changes.items())
+                            if changes else 'already up to date'))
+            part_stats.measure_file(filepath)
+            return sum(changes.values())
 
-                                if temp_object:
-                                    scene.objects.unlink(temp_object)
-                                    bpy.data.objects.remove(temp_object)
+        # The part isn't in the file, it is written from scratch
+        print("    part %s not found, rewriting the file" % part.name)
 
-                                return {'CANCELLED'}
+    print("Exporting JBeam file: " + filepath)
 
-                    if context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t],\n')
+    backup_part(filepath, settings, part_stats)
 
-                if context.scene.jbeam.export_collision_triangles and context.active_object.data.jbeam.export_collision_triangles:
-                    jbeam_file.write('//--Collision Triangles--')
-                    jbeam_file.write(new_line)
-                    temp_object.modifiers.new("tricol", "TRIANGULATE")
-                    bpy.ops.object.modifier_apply(modifier="tricol")
-
-                    if context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t"triangles":[\n\t\t["id1:", "id2:", "id3:"],\n')
-
-                    mesh = temp_object.data
-                    mesh.update(calc_edges=True, calc_edges_loose=True)
+    with part_stats.stage('write'):
+        with open(filepath, 'wt') as jbeam_file:
+            writer = writers.get_writer(settings.write_mode, jbeam_file)
+            writer.write(core.iter_sections(part, **settings.sections))
 
-                    for face in mesh.polygons:
-                        vertices = face.vertices
+    part_stats.measure_file(filepath)
 
-                        if len(vertices) == 3:
-                            if context.scene.jbeam.export_format == 'jbeam':
-                                jbeam_file.write('\t\t')
+    return writer.written
 
-                            v1, v2, v3 = vertices
 
-                            node_index1 = sorted_node_idx[v1]
-                            node_index2 = sorted_node_idx[v2]
-                            node_index3 = sorted_node_idx[v3]
-                            jbeam_file.write('["%s","%s","%s"],\n' % (
-                                sorted_nodes[node_index1].node_name, sorted_nodes[node_index2].node_name,
-                                sorted_nodes[node_index3].node_name))
-                        else:
-                            self.report({'ERROR'}, 'ERROR: TriCol %i isn\'t tri' % vertices.index)
+# File path -> Future of the export writing it in the background. Shared by the export operator and watch mode,
+# a file is never written (and backed up) by two exports at once. Only used from the main thread
+writing_files = {}
 
-                            if jbeam_file:
-                                jbeam_file.close()
 
-                            if temp_object:
-                                scene.objects.unlink(temp_object)
-                                bpy.data.objects.remove(temp_object)
+def get_file_key(filepath):
+    return os.path.normcase(os.path.abspath(filepath))
 
-                            return {'CANCELLED'}
 
-                    if context.scene.jbeam.export_format == 'jbeam':
-                        jbeam_file.write('\t],\n')
+def is_being_written(filepath):
+    key = get_file_key(filepath)
+    future = writing_files.get(key)
 
-                if context.scene.jbeam.export_format == 'jbeam':
-                    jbeam_file.write('},\n}')
+    if future is not None and future.done():
+        del writing_files[key]
+        future = None
 
-                jbeam_file.flush()
-                jbeam_file.close()
+    return future is not None
 
-                # Deselect our new object
-                temp_object.select_set(False)
 
-                # Remove the new temp object
-                scene.objects.unlink(temp_object)
-                bpy.data.objects.remove(temp_object)
+# Runs export_part() in the executor and registers the file in `writing_files` until it is written
+def submit_export(executor, part, filepath, settings, part_stats=NO_STATS):
+    future = executor.submit(export_part, part, filepath, settings, part_stats)
+    writing_files[get_file_key(filepath)] = future
 
-                if mesh.users == 0:
-                    mesh.user_clear()
+    return future
 
-                bpy.data.meshes.remove(mesh)
 
-                if temp_mesh.users == 0:
-                    temp_mesh.user_clear()
+# Exports submitted by the export operator: (object name, file name, fingerprint, Future or None if done already),
+# failed objects and the parts skipped by the export cache
+class ExportJob(object):
+    def __init__(self, directory, executor=None, export_cache=None, export_stats=None):
+        self.directory = directory
+        self.executor = executor
+        self.export_cache = export_cache
+        self.export_stats = export_stats
+        self.exports = []
+        self.errors = []
+        self.skipped_count = 0
 
-                bpy.data.meshes.remove(temp_mesh)
+    def done(self):
+        return all(future is None or future.done() for _, _, _, future in self.exports)
 
-            # Restore selection status
-            '''for o in selectedObjects:
-                o.select = True'''
+    # Waits for the exports, saves the export cache and the statistics and reports the results with
+    # report(level, message), like Operator.report(). Returns the operator result
+    def finish(self, report):
+        exported_count = 0
 
-            # Restore active object
-            bpy.context.view_layer.objects.active = active_object
+        try:
+            # Collect the results in export order
+            for name, filename, fingerprint, future in self.exports:
+                try:
+                    if future:
+                        future.result()
+
+                    exported_count += 1
+                except Exception as e:
+                    self.errors.append((name, e))
+                    continue
+
+                if self.export_cache:
+                    self.export_cache.update(filename, fingerprint)
+
+        finally:
+            if self.executor:
+                self.executor.shutdown(wait=True)
+
+        if self.export_cache and exported_count > 0:
+            try:
+                self.export_cache.save()
+            except OSError as e:
+                report({'WARNING'}, 'Could not save the export cache: ' + str(e))
+
+        if self.export_stats:
+            self.export_stats.stop()
+            self.export_stats.print_table()
+
+            try:
+                self.export_stats.save(self.directory)
+            except OSError as e:
+                report({'WARNING'}, 'Could not save the export report: ' + str(e))
+
+            report({'INFO'}, self.export_stats.summary())
+
+        for name, e in self.errors:
+            import traceback
+            traceback.print_exception(type(e), e, e.__traceback__)
+            report({'ERROR'}, 'ERROR: %s: %s' % (name, e))
 
-            self.report({'INFO'}, 'Successfully exported ' +
-                        str(export_objects_count) + (' JBeam file' if export_objects_count == 1 else ' JBeam files'))
-            return {'FINISHED'}
+        if exported_count == 0 and self.skipped_count == 0:
+            return {'CANCELLED'}
 
-        except Exception as e:
-            import traceback
-            traceback.print_exception(type(e), e, sys.exc_info()[2])
-            self.report({'ERROR'}, 'ERROR: ' + str(e))
+        report({'WARNING'} if self.errors else {'INFO'}, 'Successfully exported ' +
+               str(exported_count) + (' JBeam file' if exported_count == 1 else ' JBeam files') +
+               (', %d unchanged skipped' % self.skipped_count if self.export_cache else '') +
+               (', %d failed' % len(self.errors) if self.errors else ''))
+        return {'FINISHED'}
+
+
+# Timer callback: once every file of the job is written, reports the results in a popup and in the console.
+# The timer is persistent, loading another .blend file while the files are written doesn't drop the report
+def poll_background_job(job):
+    if not job.done():
+        return 0.1
+
+    messages = []
+
+    def report(level, message):
+        print(message)
+        messages.append(('ERROR' if 'ERROR' in level else 'INFO', message))
+
+    job.finish(report)
+    show_messages('JBeam Export', messages)
 
-            if jbeam_file:
-                jbeam_file.close()
+    return None
 
-            if temp_object:
-                scene.objects.unlink(temp_object)
-                bpy.data.objects.remove(temp_object)
 
+class SCRIPT_OT_jbeam_export(bpy.types.Operator):
+    bl_idname = 'script.jbeam_export'
+    bl_description = 'Export for use in BeamNG.drive (.jbeam)'
+    bl_label = 'Export JBeam'
+
+    filepath: bpy.props.StringProperty(
+        name="File Path",
+        description="File path used for exporting the JBeam file",
+        maxlen=1024, default="")
+
+    export_scene: bpy.props.BoolProperty(
+        name="scene_export",
+        description="exporter_prop_scene_tip",
+        default=False,
+        options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        ops.wm.call_menu(name="MENU_MT_jbeam_export")
+        return {'PASS_THROUGH'}
+
+    def execute(self, context):
+        export_objects = []
+        if self.export_scene:
+            for selectable_object in bpy.context.selectable_objects:
+                if selectable_object.type == 'MESH':
+                    if '.jbeam' in selectable_object.name:
+                        export_objects.append(selectable_object)
+
+        else:
+            for selected_object in context.selected_objects:
+                if selected_object.type == 'MESH':
+                    export_objects.append(selected_object)
+
+        export_objects_count = len(export_objects)
+
+        if export_objects_count == 0:
+            self.report({'ERROR'}, 'ERROR : At least one object must be selected to export')
             return {'CANCELLED'}
+
+        # Validate every object before writing anything, an error must not leave half of the files exported
+        export_settings = []
+        depsgraph = None
+
+        for export_object in export_objects:
+            # Edit mode changes are only in the edit mesh, write them back to the mesh
+            if export_object.mode == 'EDIT':
+                export_object.update_from_editmode()
+
+            settings = get_export_settings(context, export_object)
+            export_settings.append(settings)
+
+            # Evaluates the changes written back from edit mode, nothing is evaluated again if nothing changed
+            if settings.apply_modifiers:
+                depsgraph = context.evaluated_depsgraph_get()
+
+            if settings.beams and settings.face_diagonals and not settings.triangulate_ngons:
+                # Modifiers like Bevel or Solidify may add Ngons, the evaluated mesh is checked
+                with get_export_mesh(export_object, depsgraph) as mesh:
+                    ngons = get_ngons(mesh)
+
+                if len(ngons):
+                    self.report({'ERROR'},
+                                'ERROR: %s contains Ngons, only triangles and quads are supported '
+                                '(enable Triangulate Ngons to export them). Ngon polygon indices: %s' % (
+                                    export_object.name, core.format_indices(ngons)))
+                    return {'CANCELLED'}
+
+        if self.filepath == "":
+            if context.scene.jbeam.export_path == "":
+                self.report({'ERROR'},
+                            'No export folder set. Go to Scene > JBeam Exporter.')
+
+                return {'CANCELLED'}
+
+            if context.scene.jbeam.export_path.startswith("//") and not context.blend_data.filepath:
+                self.report({'ERROR'}, "Save the .blend file first.")
+                return {'CANCELLED'}
+            self.filepath = context.scene.jbeam.export_path
+
+        if context.scene.jbeam.export_path.startswith("//"):
+            self.filepath = bpy.path.abspath(context.scene.jbeam.export_path)
+        elif self.filepath == "" or self.filepath.startswith("//") :
+            self.filepath = bpy.path.abspath(self.filepath)
+
+        if not (os.path.isdir(self.filepath)):
+            # Creates the path if it doesn't exists
+            # useful if the default BeamNG mod directory doesn't exist
+            try:
+                os.makedirs(self.filepath, exist_ok=True)
+            except Exception as e:
+                print(e)
+                self.report({'ERROR'}, 'ERROR : Could not create export directories')
+                return {'CANCELLED'}
+
+        # Mesh data is read here on the main thread, then parts are sorted, named, formatted and written one after
+        # the other (formatting holds the GIL, threads would not run them in parallel).
+        # With `background_write` they are written by a worker thread, the operator returns right away and a timer
+        # reports the results. Blender run from the command line has no event loop to run timers, the export is
+        # finished here
+        background = context.scene.jbeam.background_write and not bpy.app.background
+        filenames = [export_object.name if '.jbeam' in export_object.name else export_object.name + '.jbeam'
+                     for export_object in export_objects]
+        busy_filenames = [filename for filename in filenames
+                          if is_being_written(os.path.join(self.filepath, filename))]
+
+        if busy_filenames:
+            self.report({'ERROR'}, 'ERROR: A previous export is still writing ' + ', '.join(busy_filenames))
+            return {'CANCELLED'}
+
+        executor = ThreadPoolExecutor(max_workers=1) if background else None
+        export_cache = cache.ExportCache(self.filepath) if context.scene.jbeam.incremental_export else None
+        export_stats = ExportStats() if context.scene.jbeam.export_stats else None
+        job = ExportJob(self.filepath, executor, export_cache, export_stats)
+
+        try:
+            for export_object, settings, filename in zip(export_objects, export_settings, filenames):
+                part_stats = export_stats.add_part(export_object.name) if export_stats else NO_STATS
+
+                try:
+                    part = get_jbeam_part(export_object, settings, part_stats, depsgraph)
+                except Exception as e:
+                    job.errors.append((export_object.name, e))
+                    continue
+
+                args = (part, os.path.join(self.filepath, filename), settings, part_stats)
+                fingerprint = None
+
+                if export_cache:
+                    fingerprint = cache.get_part_fingerprint(part, sorted(settings.sections.items()),
+                                                             print_version())
+
+                    if export_cache.is_current(filename, fingerprint):
+                        job.skipped_count += 1
+                        continue
+
+                if executor:
+                    future = submit_export(executor, *args)
+                else:
+                    future = None
+
+                    try:
+                        export_part(*args)
+                    except Exception as e:
+                        job.errors.append((export_object.name, e))
+                        continue
+
+                job.exports.append((export_object.name, filename, fingerprint, future))
+
+        except BaseException:
+            if executor:
+                executor.shutdown(wait=True)
+            raise
+
+        if not background:
+            return job.finish(self.report)
+
+        bpy.app.timers.register(functools.partial(poll_background_job, job), first_interval=0.1, persistent=True)
+
+        self.report({'INFO'}, 'Writing ' + str(len(job.exports)) +
+                    (' JBeam file' if len(job.exports) == 1 else ' JBeam files') + ' in the background')
+        return {'FINISHED'}
@@ -0,0 +1,115 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+import os
+import bpy
+import numpy as np
+from bpy_extras.io_utils import ImportHelper
+
+from . import reader
+
+
+# Builds a mesh from a core.JBeamPart: nodes become vertices, beams edges and collision triangles faces.
+# Everything is set in bulk with foreach_set
+def get_mesh(part):
+    mesh = bpy.data.meshes.new(part.name + '.jbeam')
+
+    mesh.vertices.add(part.node_count)
+    mesh.vertices.foreach_set('co', part.positions.astype(np.float32).ravel())
+
+    mesh.edges.add(len(part.beams))
+    mesh.edges.foreach_set('vertices', part.beams.astype(np.int32).ravel())
+
+    triangle_count = len(part.triangles)
+    mesh.loops.add(triangle_count * 3)
+    mesh.loops.foreach_set('vertex_index', part.triangles.astype(np.int32).ravel())
+    mesh.polygons.add(triangle_count)
+    mesh.polygons.foreach_set('loop_start', np.arange(0, triangle_count * 3, 3, dtype=np.int32))
+
+    # Since 3.6 the polygon sizes are computed from loop_start
+    if bpy.app.version < (3, 6, 0):
+        mesh.polygons.foreach_set('loop_total', np.full(triangle_count, 3, dtype=np.int32))
+
+    # Faces need edges, the ones not already made by beams are added here
+    mesh.update(calc_edges=True)
+    mesh.validate()
+
+    return mesh
+
+
+def add_vertex_groups(obj, part):
+    vertex_groups = [obj.vertex_groups.new(name=group_name) for group_name in part.group_names]
+
+    for group_id, group_set in enumerate(part.group_sets):
+        indices = np.flatnonzero(part.group_ids == group_id).tolist()
+
+        for group in group_set:
+            vertex_groups[group].add(indices, 1.0, 'REPLACE')
+
+
+class SCRIPT_OT_jbeam_import(bpy.types.Operator, ImportHelper):
+    bl_idname = 'script.jbeam_import'
+    bl_description = 'Import a BeamNG.drive JBeam file (.jbeam), one object per part'
+    bl_label = 'Import JBeam'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = '.jbeam'
+
+    filter_glob: bpy.props.StringProperty(
+        default='*.jbeam',
+        options={'HIDDEN'})
+
+    def execute(self, context):
+        try:
+            parts = reader.read_parts(self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, 'ERROR: Could not read %s: %s' % (os.path.basename(self.filepath), e))
+            return {'CANCELLED'}
+
+        if len(parts) == 0:
+            self.report({'ERROR'}, 'ERROR: No part found in ' + os.path.basename(self.filepath))
+            return {'CANCELLED'}
+
+        skipped_count = 0
+
+        for part, skipped in parts:
+            mesh = get_mesh(part)
+            mesh.jbeam.slot_type = part.slot_type
+
+            if part.information is not None:
+                mesh.jbeam.name = str(part.information['name'])
+
+                if isinstance(part.information['value'], (int, float)):
+                    mesh.jbeam.value = int(part.information['value'])
+                    mesh.jbeam.export_value = True
+
+            obj = bpy.data.objects.new(mesh.name, mesh)
+            context.collection.objects.link(obj)
+            add_vertex_groups(obj, part)
+
+            skipped_count += skipped
+
+        self.report({'WARNING'} if skipped_count else {'INFO'}, 'Imported ' + str(len(parts)) +
+                    (' JBeam part' if len(parts) == 1 else ' JBeam parts') +
+                    (', %d beam(s)/triangle(s) using nodes of other parts skipped' % skipped_count
+                     if skipped_count else ''))
+        return {'FINISHED'}
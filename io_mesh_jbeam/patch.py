@@ -0,0 +1,1165 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Patch mode: updates an existing (hand tuned) JBeam file instead of overwriting it.
+# Only the coordinates of the nodes, and the rows of nodes, beams and triangles which were added or removed,
+# are changed. Nodes, beams and triangles are matched by node names. Everything else, beam properties,
+# other sections, comments, formatting and line endings, is copied byte for byte.
+# Nodes keep the names they have in the file (see keep_node_names()), only new nodes get new names.
+# A small change on a big part must stay cheap: lines holding a single row are found with NumPy (see RowLines)
+# and skipped by the tokenizer, names become integer ids (see NameTable) and nodes, beams and triangles are
+# matched on NumPy arrays. Only the rows which change are located in the text.
+# Does not depend on bpy.
+
+import bisect
+import collections
+import io
+import itertools
+import os
+
+import numpy as np
+
+from . import core
+from . import reader
+
+SECTIONS = ('nodes', 'beams', 'triangles')
+
+# Longest indentation and longest text after the ']' of a line found by RowLines
+MAX_INDENT = 32
+MAX_LINE_END = 8
+
+
+# Returns a boolean lookup table of the bytes `characters`
+def get_byte_table(characters):
+    table = np.zeros(256, dtype=bool)
+    table[list(characters)] = True
+
+    return table
+
+
+INDENT_BYTES = get_byte_table(b' \t')
+LINE_END_BYTES = get_byte_table(b' \t\r,')
+SEPARATOR_BYTES = get_byte_table(b' \t,')
+
+# Masks keeping the first 0..8 bytes of a little endian 64-bit word, and the multiplier of the hash of the words
+WORD_MASKS = np.array([(1 << (8 * length)) - 1 for length in range(9)], dtype=np.uint64)
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+# Returns which of the spans (starts, ends) of `data` only hold bytes of `table`, spans longer than `limit` don't
+def only_bytes(data, starts, ends, table, limit):
+    lengths = ends - starts
+    valid = (lengths >= 0) & (lengths <= limit)
+
+    for offset in range(int(lengths[valid].max(initial=0))):
+        checked = np.flatnonzero(valid & (lengths > offset))
+        valid[checked] = table[data[starts[checked] + offset]]
+
+    return valid
+
+
+# Returns the positions of the brackets, braces, slashes and backslashes (and '|') of `data`
+def find_special(data):
+    # '[', '\\' and ']' are '{', '|' and '}' with the 0x20 bit set
+    special = np.bitwise_or(data, 0x20)
+    special -= ord('{')
+    special = special < 3
+    special |= data == ord('/')
+
+    return np.flatnonzero(special)
+
+
+# Lines holding a single row of strings and numbers, like '\t\t["n1","n2"],': only indentation before the '[',
+# only a comma and whitespace after the ']'. Most of a file is made of these, they are found at once with NumPy
+# and the tokenizer skips runs of consecutive row lines (see iter_tokens()).
+# Only for ASCII text without block comments (see `valid`), positions in the text and in its bytes are then the same
+class RowLines(object):
+    def __init__(self, text):
+        data = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        line_starts = np.concatenate(([0], np.flatnonzero(data == ord('\n')) + 1))
+        line_ends = np.append(line_starts[1:] - 1, len(data))
+
+        # Index of the first of the `positions` of every line and how many every line has
+        def count(positions):
+            firsts = np.searchsorted(positions, line_starts)
+
+            return firsts, np.diff(np.append(firsts, len(positions)))
+
+        self.quotes = np.flatnonzero(data == ord('"'))
+        quote_firsts, quote_counts = count(self.quotes)
+
+        # A row line has two brackets, braces, slashes or backslashes: the '[' and ']' of the row, with only
+        # indentation before and a comma and whitespace after
+        special = find_special(data)
+        special_firsts, special_counts = count(special)
+
+        # A string or a block comment going over several lines could hold lines looking like rows
+        slashes = special[data[special] == ord('/')]
+        slashes = slashes[slashes < len(data) - 1]
+        self.valid = not (quote_counts % 2).any() and not (data[slashes + 1] == ord('*')).any()
+        lines = np.flatnonzero(special_counts == 2)
+        starts = special[special_firsts[lines]]
+        ends = special[special_firsts[lines] + 1] + 1
+        row_lines = (data[starts] == ord('[')) & (data[ends - 1] == ord(']')) & \
+            only_bytes(data, line_starts[lines], starts, INDENT_BYTES, MAX_INDENT) & \
+            only_bytes(data, ends, line_ends[lines], LINE_END_BYTES, MAX_LINE_END)
+        lines, starts, ends = lines[row_lines], starts[row_lines], ends[row_lines]
+
+        self.data = data
+        # Span of the row of every row line, index of its first quote in `quotes` and number of quotes
+        self.starts = starts
+        self.ends = ends
+        self.first_quotes = quote_firsts[lines]
+        self.quote_counts = quote_counts[lines]
+
+        # Start of the first row -> (first, last) row line of every run of consecutive row lines
+        breaks = np.flatnonzero(np.diff(lines) != 1) + 1
+        firsts = np.concatenate(([0], breaks)) if len(lines) else breaks
+        lasts = np.append(breaks - 1, len(lines) - 1) if len(lines) else breaks
+        self.runs = dict(zip(self.starts[firsts].tolist(), zip(firsts.tolist(), lasts.tolist())))
+
+    @classmethod
+    def find(cls, text):
+        if not text.isascii():
+            return None
+
+        row_lines = cls(text)
+
+        return row_lines if row_lines.valid else None
+
+    # Returns which of the row lines first..last start with `size` strings,
+    # and the (starts, lengths) of these strings for each of the `size` columns
+    def get_names(self, first, last, size):
+        first_quotes = self.first_quotes[first:last + 1]
+        valid = self.quote_counts[first:last + 1] >= 2 * size
+        rows = np.flatnonzero(valid)
+        first_quotes = first_quotes[rows]
+        openings = [self.quotes[first_quotes + 2 * column] for column in range(size)]
+        closings = [self.quotes[first_quotes + 2 * column + 1] for column in range(size)]
+
+        # Nothing but separators before every string, else the values before are not strings
+        separated = only_bytes(self.data, self.starts[first + rows] + 1, openings[0], SEPARATOR_BYTES, MAX_INDENT)
+
+        for column in range(1, size):
+            separated &= only_bytes(self.data, closings[column - 1] + 1, openings[column], SEPARATOR_BYTES,
+                                    MAX_INDENT)
+
+        valid[rows[~separated]] = False
+        starts = [opening[separated] + 1 for opening in openings]
+        lengths = [closing[separated] - start for closing, start in zip(closings, starts)]
+
+        return valid, starts, lengths
+
+    # Returns which of the row lines first..last are a name and three numbers, the (starts, lengths) of the names
+    # and the (N, 3) array of the numbers
+    def get_nodes(self, first, last):
+        valid, (starts,), (lengths,) = self.get_names(first, last, 1)
+        rows = np.flatnonzero(valid)
+        single_names = self.quote_counts[first + rows] == 2
+        valid[rows[~single_names]] = False
+        rows, starts, lengths = rows[single_names], starts[single_names], lengths[single_names]
+
+        # Text between the closing quote of the name and the ']', the quote is a separator
+        value_starts = starts + lengths
+        value_lengths = self.ends[first + rows] - 1 - value_starts
+        offsets = np.cumsum(value_lengths) - value_lengths
+        values = self.data[np.repeat(value_starts - offsets, value_lengths) + np.arange(value_lengths.sum())]
+        separators = SEPARATOR_BYTES[values] | (values == ord('"'))
+        value_firsts = ~separators
+        value_firsts[1:] &= separators[:-1]
+        row_ids = np.repeat(np.arange(len(rows)), value_lengths)
+        three_values = np.bincount(row_ids[value_firsts], minlength=len(rows)) == 3
+
+        values[separators | ~three_values[row_ids]] = ord(' ')
+
+        try:
+            positions = np.array(values.tobytes().split(), dtype=np.float64).reshape(-1, 3)
+        except ValueError:
+            three_values[:] = False
+            positions = np.empty((0, 3))
+
+        valid[rows[~three_values]] = False
+
+        return valid, starts[three_values], lengths[three_values], positions
+
+
+# Returns the number of names of a source of names, a list of strings or (starts, lengths) spans of the text
+def get_source_size(source):
+    return len(source) if isinstance(source, list) else len(source[0])
+
+
+# Returns the sources of names holding the names at the given indices of `sources`
+def select_names(sources, indices):
+    selected = []
+    offset = 0
+
+    for source in sources:
+        size = get_source_size(source)
+        source_indices = indices[(indices >= offset) & (indices < offset + size)] - offset
+        offset += size
+
+        if isinstance(source, list):
+            selected.append([source[i] for i in source_indices.tolist()])
+        else:
+            selected.append((source[0][source_indices], source[1][source_indices]))
+
+    return selected
+
+
+# Finds the nodes of names. The nodes are given by the sources of their names (see get_source_size()) and their
+# row indices. Names are turned into keys by get_keys(), then compared with is_name() or looked up with get_nodes().
+# With the bytes of the text, keys are 64-bit words and names are looked up in a NumPy hash table (open addressing),
+# without creating a Python string per name. Without them, keys are the names and the table is a dictionary
+class NameTable(object):
+    def __init__(self, data, sources, row_indices):
+        self.data = data
+        # Rows repeating a name don't add a node, names are found in the first of them
+        order = np.argsort(row_indices, kind='stable')
+
+        if data is None:
+            self.names = list(itertools.chain(*sources))
+            self.nodes = {}
+
+            for node_index in order.tolist():
+                self.nodes.setdefault(self.names[node_index], node_index)
+
+            self.first_nodes = self.get_nodes(self.names)
+            return
+
+        lengths = [source[1] if isinstance(source, tuple) else np.fromiter(map(len, source), dtype=np.int64,
+                                                                            count=len(source)) for source in sources]
+        self.words = max(-(-int(np.concatenate(lengths + [np.ones(1, dtype=np.int64)]).max()) // 8), 1)
+        padded = np.append(data, np.zeros(8 * self.words, dtype=np.uint8))
+        # Little endian word starting at every byte
+        self.byte_words = np.ndarray((len(padded) - 7,), dtype='<u8', buffer=padded, strides=(1,))
+        self.node_keys = self.get_keys(sources)
+
+        sort = order[np.lexsort(self.node_keys[order].T[::-1])]
+        sorted_keys = self.node_keys[sort]
+        first = np.ones(len(sort), dtype=bool)
+        first[1:] = (sorted_keys[1:] != sorted_keys[:-1]).any(axis=1)
+        self.first_nodes = np.empty(len(sort), dtype=np.int64)
+        self.first_nodes[sort] = sort[first][np.cumsum(first) - 1]
+
+        # At least twice as many slots as nodes
+        self.bits = max((2 * len(sort)).bit_length(), 1)
+        self.table = np.full(1 << self.bits, -1, dtype=np.int64)
+        pending = sort[first]
+        slots = self.get_slots(self.node_keys[pending])
+
+        while len(pending):
+            free = self.table[slots] == -1
+            self.table[slots[free]] = pending[free]
+            placed = self.table[slots] == pending
+            pending = pending[~placed]
+            slots = (slots[~placed] + 1) & (len(self.table) - 1)
+
+    # Returns the keys of the names of the sources, as a (N, words) array. Names longer than the names of the nodes
+    # get a key of 0xFF bytes, which no ASCII name has
+    def get_keys(self, sources):
+        if self.data is None:
+            return list(itertools.chain(*sources))
+
+        blocks = [np.empty((0, self.words), dtype=np.uint64)]
+
+        for source in sources:
+            if isinstance(source, list):
+                lengths = np.fromiter(map(len, source), dtype=np.int64, count=len(source))
+                block = np.array([name if len(name) <= 8 * self.words else '' for name in source],
+                                 dtype='S%d' % (8 * self.words)).view('<u8').reshape(-1, self.words)
+            else:
+                starts, lengths = source
+                block = np.stack([self.byte_words[starts + 8 * word] & WORD_MASKS[np.clip(lengths - 8 * word, 0, 8)]
+                                  for word in range(self.words)], axis=1)
+
+            block[lengths > 8 * self.words] = WORD_MASKS[8]
+            blocks.append(block)
+
+        return np.concatenate(blocks)
+
+    def get_slots(self, keys):
+        hashes = keys[:, 0].copy()
+
+        for word in range(1, self.words):
+            hashes *= HASH_MULTIPLIER
+            hashes ^= keys[:, word]
+
+        hashes *= HASH_MULTIPLIER
+
+        return (hashes >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    # Returns whether the names of the keys at the given indices are the names of the given nodes (-1: no node)
+    def is_name(self, keys, indices, nodes):
+        if self.data is None:
+            return np.array([node != -1 and self.names[node] == keys[i]
+                             for i, node in zip(indices.tolist(), nodes.tolist())], dtype=bool)
+
+        return (keys[indices] == self.node_keys[nodes]).all(axis=1) & (nodes != -1)
+
+    # Returns the node of the names of the keys at the given indices (all of them by default), -1 for names which
+    # are not nodes
+    def get_nodes(self, keys, indices=None):
+        if self.data is None:
+            if indices is not None:
+                keys = [keys[i] for i in indices.tolist()]
+
+            return np.fromiter((self.nodes.get(name, -1) for name in keys), dtype=np.int64, count=len(keys))
+
+        if indices is not None:
+            keys = keys[indices]
+
+        nodes = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        slots = self.get_slots(keys)
+
+        while len(pending):
+            entries = self.table[slots]
+            used = entries != -1
+            equal = used.copy()
+            equal[used] = (self.node_keys[entries[used]] == keys[pending[used]]).all(axis=1)
+            nodes[pending[equal]] = entries[equal]
+            probing = used & ~equal
+            pending = pending[probing]
+            slots = (slots[probing] + 1) & (len(self.table) - 1)
+
+        return nodes
+
+    # Returns the indices of the names of the keys which are names of the given nodes
+    def find(self, keys, nodes):
+        if self.data is None:
+            names = set(self.get_names(nodes))
+
+            return np.flatnonzero(np.fromiter((name in names for name in keys), dtype=bool, count=len(keys)))
+
+        # The first word of the names sorts out most of the other names
+        indices = np.flatnonzero(is_in(keys[:, 0], self.node_keys[nodes, 0]))
+
+        return indices[is_in(self.get_nodes(keys, indices), nodes)]
+
+    # Returns the names of the given nodes
+    def get_names(self, nodes):
+        if self.data is None:
+            return [self.names[i] for i in nodes.tolist()]
+
+        return self.node_keys[nodes].view('S%d' % (8 * self.words))[:, 0].astype(str).tolist()
+
+    # Returns the names of the sources of names
+    def get_source_names(self, sources):
+        names = []
+
+        for source in sources:
+            if isinstance(source, list):
+                names.extend(source)
+            else:
+                names.extend(self.data[start:start + length].tobytes().decode('ascii')
+                             for start, length in zip(source[0].tolist(), source[1].tolist()))
+
+        return names
+
+
+# Rows of one of the SECTIONS of the part in the file, in blocks:
+# 'lines': row lines start..end of RowLines, 'rows': a `rows` token of the reader, 'row': a row with inline properties
+class Section(object):
+    def __init__(self, row_lines=None):
+        self.row_lines = row_lines
+        # (kind, start, end, rows) of every block, rows are None for 'lines' blocks until they are parsed
+        self.blocks = []
+        # Index of the first row of every block
+        self.first_rows = []
+        self.row_count = 0
+        self.block_spans = {}
+        # Position of the closing bracket
+        self.end = None
+
+    def add_block(self, kind, start, end, rows=None):
+        count = end - start + 1 if kind == 'lines' else len(rows)
+
+        if count:
+            self.blocks.append((kind, start, end, rows))
+            self.first_rows.append(self.row_count)
+            self.row_count += count
+
+    # Returns the values of a row
+    def get_row(self, text, row_index):
+        start, end = self.get_span(text, row_index)
+
+        return reader.parse_rows(text[start:end], lambda: text.count('\n', 0, start) + 1)[0]
+
+    # Returns the (start, end) of a row in the text
+    def get_span(self, text, row_index):
+        block_index = bisect.bisect_right(self.first_rows, row_index) - 1
+        kind, start, end, _ = self.blocks[block_index]
+        offset = row_index - self.first_rows[block_index]
+
+        if kind == 'lines':
+            return int(self.row_lines.starts[start + offset]), int(self.row_lines.ends[start + offset])
+
+        if kind == 'row':
+            return start, end
+
+        spans = self.block_spans.get(block_index)
+
+        if spans is None:
+            spans = self.block_spans[block_index] = [row.span() for row in reader.ROW.finditer(text, start, end)]
+
+        return spans[offset]
+
+
+# Yields the (kind, start, end) of the tokens of the text, see reader.TOKEN.
+# Runs of row lines are yielded as a single 'row_lines' token, start and end are then their first and last row line
+def iter_tokens(text, row_lines=None):
+    runs = row_lines.runs if row_lines is not None else {}
+    position = 0
+
+    while position < len(text):
+        run = runs.get(position)
+
+        if run is not None:
+            yield 'row_lines', run[0], run[1]
+            position = int(row_lines.ends[run[1]])
+            continue
+
+        match = reader.TOKEN.match(text, position)
+        yield match.lastgroup, position, match.end()
+        position = match.end()
+
+
+# Finds the sections of the part `part_name` in the text of a JBeam file.
+# Returns the sections found (name -> Section) and the position of the closing brace of the part,
+# or None if the part isn't in the file
+def scan_part(text, part_name, row_lines=None):
+    sections = {}
+    part_end = None
+    # One entry per open object or array: [is_object, key of the container, pending key, start if tracked]
+    stack = []
+
+    def get_line(position):
+        return text.count('\n', 0, position) + 1
+
+    for kind, start, end in iter_tokens(text, row_lines):
+        if kind == 'skip':
+            continue
+
+        if kind == 'row_lines':
+            token_start = int(row_lines.starts[start])
+        else:
+            token_start = start
+
+        if kind == 'error':
+            raise reader.JBeamSyntaxError('Unexpected character %r' % text[start:end], get_line(start))
+
+        if kind == 'close_object' or kind == 'close_array':
+            if not stack or stack[-1][0] != (kind == 'close_object'):
+                raise reader.JBeamSyntaxError('Unexpected %r' % text[start:end], get_line(start))
+
+            is_object, key, pending_key, element_start = stack.pop()
+
+            if element_start is not None:
+                value = reader.parse(io.StringIO(text[element_start:end]))
+
+                # Rows with inline properties, modifiers like {"group":"a"} are not rows
+                if isinstance(value, list):
+                    sections[stack[2][1]].add_block('row', element_start, end, [value])
+            elif len(stack) == 2 and stack[1][1] == part_name and key in SECTIONS:
+                sections[key].end = start
+            elif len(stack) == 1 and key == part_name:
+                part_end = start
+
+            continue
+
+        top = stack[-1] if stack else None
+
+        # Key of an object
+        if top is not None and top[0] and top[2] is None:
+            if kind in ('rows', 'row_lines', 'open_object', 'open_array'):
+                raise reader.JBeamSyntaxError('Expected a key', get_line(token_start))
+
+            top[2] = str(reader.parse_scalar(kind, text[start:end]))
+            continue
+
+        key = None
+
+        if top is not None and top[0]:
+            key = top[2]
+            top[2] = None
+
+        # Element of a section of the part
+        tracked = len(stack) == 3 and stack[1][1] == part_name and stack[2][1] in SECTIONS
+
+        if kind == 'rows':
+            if tracked:
+                rows = reader.parse_rows(text[start:end], lambda: get_line(start))
+                sections[stack[2][1]].add_block('rows', start, end, rows)
+        elif kind == 'row_lines':
+            if tracked:
+                sections[stack[2][1]].add_block('lines', start, end)
+        elif kind == 'open_object' or kind == 'open_array':
+            if len(stack) == 2 and stack[1][1] == part_name and key in SECTIONS and kind == 'open_array':
+                sections[key] = Section(row_lines)
+
+            stack.append([kind == 'open_object', key, None, start if tracked else None])
+
+    if stack:
+        raise reader.JBeamSyntaxError('Unexpected end of file, %d unclosed bracket(s)' % len(stack),
+                                      get_line(len(text)))
+
+    if part_end is None:
+        return None
+
+    return sections, part_end
+
+
+# Returns the span of a row to delete: its whole line if nothing else is on it, else the row and its comma
+def get_row_deletion(text, start, end):
+    line_start = text.rfind('\n', 0, start) + 1
+    line_end = text.find('\n', end)
+    line_end = len(text) if line_end == -1 else line_end + 1
+
+    if text[line_start:start].strip() == '' and text[end:line_end].strip() in ('', ','):
+        return line_start, line_end
+
+    if text[end:end + 1] == ',':
+        end += 1
+
+    return start, end
+
+
+# Returns the indentation of the rows of a section and where new rows go:
+# the start of the line of the closing bracket, if the bracket is alone on its line
+def get_row_insertion(text, section):
+    indent = '\t\t'
+
+    if section.blocks:
+        start = section.get_span(text, section.first_rows[-1])[0]
+        line_start = text.rfind('\n', 0, start) + 1
+
+        if text[line_start:start].strip() == '':
+            indent = text[line_start:start]
+
+    line_start = text.rfind('\n', 0, section.end) + 1
+
+    if text[line_start:section.end].strip() == '':
+        return indent, line_start, ''
+
+    return indent, section.end, '\n'
+
+
+# Returns the indentation of the rows of a section and where new rows go: right after the header row,
+# before the property modifiers of the section (like {"beamSpring":...}), so new rows get the default properties
+# instead of the ones of the last rows. Without header, new rows go at the end (see get_row_insertion())
+def get_header_insertion(text, section, header_row):
+    indent, position, prefix = get_row_insertion(text, section)
+
+    if header_row is None:
+        return indent, position, prefix
+
+    header_end = section.get_span(text, header_row)[1]
+    line_end = text.find('\n', header_end)
+
+    if line_end != -1 and text[header_end:line_end].strip() in ('', ','):
+        return indent, line_end + 1, ''
+
+    if text[header_end:header_end + 1] == ',':
+        header_end += 1
+
+    return indent, header_end, '\n'
+
+
+# Spans of the first `count` values of the row starting at `start`
+def get_value_spans(text, start, end, count):
+    spans = []
+
+    for match in reader.TOKEN.finditer(text, start + 1, end - 1):
+        if match.lastgroup != 'skip':
+            spans.append(match.span())
+
+            if len(spans) == count:
+                break
+
+    return spans
+
+
+# Node rows of the nodes section: their row index in the section, the sources of their names (see NameTable)
+# and their positions rounded like the positions of the part
+FileNodes = collections.namedtuple('FileNodes', ('row_indices', 'names', 'positions'))
+
+
+# Rows with a name and three numbers are nodes
+def is_node_row(row):
+    return len(row) >= 4 and type(row[0]) is str and all(type(value) is not str for value in row[1:4])
+
+
+def read_file_nodes(text, section, decimals):
+    row_indices = []
+    names = []
+    positions = []
+
+    for (kind, start, end, rows), first_row in zip(section.blocks, section.first_rows):
+        if kind == 'lines':
+            valid, starts, lengths, block_positions = section.row_lines.get_nodes(start, end)
+            row_indices.append(first_row + np.flatnonzero(valid))
+            names.append((starts, lengths))
+            positions.append(block_positions)
+
+            # The other rows, like the header row, are parsed
+            indices = np.flatnonzero(~valid).tolist()
+            rows = dict(zip(indices, (section.get_row(text, first_row + i) for i in indices)))
+        else:
+            indices = range(len(rows))
+
+        indices = [i for i in indices if is_node_row(rows[i])]
+        row_indices.append(first_row + np.array(indices, dtype=np.int64))
+        names.append([rows[i][0] for i in indices])
+        positions.append(np.array([rows[i][1:4] for i in indices], dtype=np.float64).reshape(-1, 3))
+
+    row_indices = np.concatenate(row_indices + [np.empty(0, dtype=np.int64)])
+    positions = np.concatenate(positions + [np.empty((0, 3))])
+
+    return FileNodes(row_indices, names, np.round(positions, decimals))
+
+
+# Beam or triangle rows of a section: their row index in the section, the sources of the names of every column
+# (see NameTable), and the index of the header row (["id1:", "id2:"]), None if there is none
+FileConnections = collections.namedtuple('FileConnections', ('row_indices', 'names', 'header_row'))
+
+
+def read_file_connections(text, section, size):
+    row_indices = []
+    names = [[] for _ in range(size)]
+    header_row = None
+
+    for (kind, start, end, rows), first_row in zip(section.blocks, section.first_rows):
+        if kind == 'lines':
+            valid, starts, lengths = section.row_lines.get_names(start, end, size)
+            indices = first_row + np.flatnonzero(valid)
+
+            if header_row is None and len(indices) and lengths[0][0] and \
+                    section.row_lines.data[starts[0][0] + lengths[0][0] - 1] == ord(':'):
+                header_row = int(indices[0])
+                indices, starts, lengths = indices[1:], [s[1:] for s in starts], [n[1:] for n in lengths]
+
+            for column in range(size):
+                names[column].append((starts[column], lengths[column]))
+        else:
+            indices = [i for i, row in enumerate(rows) if len(row) >= size and
+                       all(type(value) is str for value in row[:size])]
+
+            if header_row is None and indices and rows[indices[0]][0].endswith(':'):
+                header_row = first_row + indices.pop(0)
+
+            for column in range(size):
+                names[column].append([rows[i][column] for i in indices])
+
+            indices = first_row + np.array(indices, dtype=np.int64)
+
+        row_indices.append(indices)
+
+    row_indices = np.concatenate(row_indices + [np.empty(0, dtype=np.int64)])
+
+    return FileConnections(row_indices, names, header_row)
+
+
+# Returns whether every value is in `test_values`, like np.isin() with a sort and a binary search
+def is_in(values, test_values):
+    if not len(test_values):
+        return np.zeros(len(values), dtype=bool)
+
+    test_values = np.sort(test_values)
+
+    return test_values[np.minimum(np.searchsorted(test_values, values), len(test_values) - 1)] == values
+
+
+# Returns the rank of every value among the distinct values
+def get_ranks(values):
+    order = np.argsort(values)
+    sorted_values = values[order]
+    new_values = np.ones(len(order), dtype=bool)
+    new_values[1:] = sorted_values[1:] != sorted_values[:-1]
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.cumsum(new_values) - 1
+
+    return ranks
+
+
+# Returns one integer key per connection (rows of node indices), equal for connections using the same nodes
+# in any order. `index_count` is the number of node indices. Keys are built one column at a time, when they could
+# overflow the keys of the previous columns are replaced by their rank
+def get_connection_keys(connections, index_count):
+    # Sorts the (few) columns of every row with a sorting network
+    columns = [connections[:, column] for column in range(connections.shape[1])]
+
+    for last in range(len(columns) - 1, 0, -1):
+        for column in range(last):
+            columns[column], columns[column + 1] = np.minimum(columns[column], columns[column + 1]), \
+                np.maximum(columns[column], columns[column + 1])
+
+    keys = columns[0]
+    key_count = index_count
+
+    for values in columns[1:]:
+        if key_count * index_count >= 2 ** 63:
+            keys = get_ranks(keys)
+            key_count = len(keys)
+
+        keys = keys * index_count + values
+        key_count *= index_count
+
+    return keys
+
+
+# Returns an index -> set of connected indices dictionary for the (N, 2) array `edges`
+def get_neighbors(edges):
+    neighbors = collections.defaultdict(set)
+
+    for index1, index2 in edges.tolist():
+        neighbors[index1].add(index2)
+        neighbors[index2].add(index1)
+
+    return neighbors
+
+
+# Yields pairs of indices of two sequences of `count` and `other_count` elements aligned at their start, then at their
+# end. A file written by the exporter has its nodes, beams and triangles in the order of the part, rows added or
+# removed at one place only shift the rows after them
+def get_alignments(count, other_count):
+    length = min(count, other_count)
+    yield np.arange(length), np.arange(length)
+
+    if count != other_count:
+        yield np.arange(count - length, count), np.arange(other_count - length, other_count)
+
+
+# Matches the nodes of the part with the `candidates` nodes of the file having the same (rounded) position.
+# Nodes in the order of the file are matched first (see get_alignments()), the other ones are sorted by position,
+# several nodes at the same position are paired in order. Returns the file node index of every node, or -1
+def match_positions(part, file_positions, candidates):
+    node_files = np.full(part.node_count, -1, dtype=np.int64)
+    file_matched = np.zeros(len(candidates), dtype=bool)
+
+    for node_indices, file_indices in get_alignments(part.node_count, len(candidates)):
+        same = (part.positions[node_indices] == file_positions[candidates[file_indices]]).all(axis=1) & \
+            (node_files[node_indices] == -1) & ~file_matched[file_indices]
+        node_files[node_indices[same]] = candidates[file_indices[same]]
+        file_matched[file_indices[same]] = True
+
+    nodes = np.flatnonzero(node_files == -1)
+    candidates = candidates[~file_matched]
+
+    if not len(nodes) or not len(candidates):
+        return node_files
+
+    positions = np.concatenate((part.positions[nodes], file_positions[candidates]))
+    sides = np.repeat([0, 1], [len(nodes), len(candidates)])
+
+    # Sorted by position then side, nodes of the part before nodes of the file, both in order (lexsort is stable)
+    order = np.lexsort((sides, positions[:, 2], positions[:, 1], positions[:, 0]))
+    sorted_positions = positions[order]
+    new_position = np.ones(len(order), dtype=bool)
+    new_position[1:] = (sorted_positions[1:] != sorted_positions[:-1]).any(axis=1)
+    position_ids = np.cumsum(new_position) - 1
+
+    # Rank of every node among the nodes of its side at its position
+    new_run = new_position.copy()
+    new_run[1:] |= sides[order][1:] != sides[order][:-1]
+    run_starts = np.flatnonzero(new_run)
+    ranks = np.arange(len(order)) - run_starts[np.cumsum(new_run) - 1]
+
+    keys = np.empty(len(order), dtype=np.int64)
+    keys[order] = position_ids * len(order) + ranks
+    _, node_indices, file_indices = np.intersect1d(keys[:len(nodes)], keys[len(nodes):], assume_unique=True,
+                                                   return_indices=True)
+    node_files[nodes[node_indices]] = candidates[file_indices]
+
+    return node_files
+
+
+# Returns the beams of the file touching the `file_indices` nodes, as (N, 2) file node indices.
+# `beam_keys` are the keys of the names of both columns of the beams (see NameTable.get_keys())
+def find_file_edges(beam_keys, name_table, file_indices):
+    rows = np.unique(np.concatenate([name_table.find(keys, file_indices) for keys in beam_keys]))
+    edges = np.stack([name_table.get_nodes(keys, rows) for keys in beam_keys], axis=1).reshape(-1, 2)
+
+    return edges[(edges != -1).all(axis=1)]
+
+
+# Matches nodes which moved by their beams: a node of the file and a node of the part connected to the same
+# already matched nodes are the same node. Every pass only looks at the nodes next to the ones matched by the
+# previous pass. `file_edges` are beams of the file as file node indices
+def match_neighbors(part, node_files, file_edges, file_unmatched):
+    node_unmatched = node_files == -1
+    part_edges = part.beams[node_unmatched[part.beams].any(axis=1)]
+    file_edges = file_edges[file_unmatched[file_edges].any(axis=1)]
+    node_neighbors = get_neighbors(part_edges)
+    file_neighbors = get_neighbors(file_edges)
+    node_files = node_files.tolist()
+    matched_files = set(np.flatnonzero(~file_unmatched).tolist())
+    pending_nodes = set(part_edges[node_unmatched[part_edges]].tolist())
+    pending_files = set(file_edges[file_unmatched[file_edges]].tolist())
+
+    while pending_nodes and pending_files:
+        node_keys = collections.defaultdict(list)
+        file_keys = collections.defaultdict(list)
+
+        for node_index in pending_nodes:
+            key = frozenset(node_files[i] for i in node_neighbors[node_index] if node_files[i] != -1)
+
+            if key:
+                node_keys[key].append(node_index)
+
+        for file_index in pending_files:
+            key = frozenset(file_neighbors[file_index] & matched_files)
+
+            if key:
+                file_keys[key].append(file_index)
+
+        matches = [(node_keys[key][0], file_indices[0]) for key, file_indices in file_keys.items()
+                   if len(file_indices) == 1 and len(node_keys.get(key, ())) == 1]
+
+        if not matches:
+            break
+
+        pending_nodes = set()
+        pending_files = set()
+
+        for node_index, file_index in matches:
+            node_files[node_index] = file_index
+            matched_files.add(file_index)
+            pending_nodes.update(node_neighbors[node_index])
+            pending_files.update(file_neighbors[file_index])
+
+        pending_nodes = {i for i in pending_nodes if node_files[i] == -1}
+        pending_files.difference_update(matched_files)
+
+    return np.array(node_files, dtype=np.int64)
+
+
+# Matches the nodes of the part with the nodes of the file, so editing the mesh doesn't rename (and re-append
+# the beams of) every node after the edit. JBeamPart.name_nodes() names nodes by their sort position.
+# Nodes are matched by position first, then nodes which moved are matched by their beams (see match_neighbors()).
+# When only moved nodes are left, like when the whole part moved, and as many in the file as in the part,
+# they are paired in the order of their positions (Y, -X, Z). The other nodes are new.
+# `beam_keys` are the keys of the names of the beams of the file, None without beams.
+# Returns the file node index of every node, -1 for new nodes
+def match_nodes(part, file_nodes, beam_keys, name_table):
+    # Only the first of several nodes with the same name can be matched
+    candidates = np.flatnonzero(name_table.first_nodes == np.arange(len(name_table.first_nodes)))
+    node_files = match_positions(part, file_nodes.positions, candidates)
+    file_unmatched = np.zeros(len(file_nodes.positions), dtype=bool)
+    file_unmatched[candidates] = True
+    file_unmatched[node_files[node_files != -1]] = False
+
+    if beam_keys is not None and file_unmatched.any() and (node_files == -1).any() and (node_files != -1).any():
+        file_edges = find_file_edges(beam_keys, name_table, np.flatnonzero(file_unmatched))
+        node_files = match_neighbors(part, node_files, file_edges, file_unmatched)
+        file_unmatched[node_files[node_files != -1]] = False
+
+    unmatched_nodes = np.flatnonzero(node_files == -1)
+    unmatched_files = np.flatnonzero(file_unmatched)
+
+    if len(unmatched_nodes) and len(unmatched_nodes) == len(unmatched_files):
+        for positions, indices in ((part.positions, unmatched_nodes), (file_nodes.positions, unmatched_files)):
+            indices[:] = indices[np.lexsort((positions[indices, 2], -positions[indices, 0], positions[indices, 1]))]
+
+        node_files[unmatched_nodes] = unmatched_files
+
+    return node_files
+
+
+# Names the nodes of the part with the names they have in the file (see match_nodes()), new nodes keep their
+# default name unless the file uses it already. `other_names` are the names used by the beams and triangles
+# of the file which are not nodes of the file
+def keep_node_names(part, node_files, other_names, name_table):
+    matched = np.flatnonzero(node_files != -1)
+    node_names = np.array(part.node_names, dtype=object)
+    node_names[matched] = name_table.get_names(node_files[matched])
+    unmatched_nodes = np.flatnonzero(node_files == -1)
+
+    if len(unmatched_nodes):
+        # Names of the file: its nodes and the nodes of other parts used by its beams and triangles
+        taken_names = set(name_table.get_names(np.flatnonzero(name_table.first_nodes ==
+                                                              np.arange(len(name_table.first_nodes)))))
+        taken_names.update(other_names)
+        next_number = part.node_count
+
+        for node_index in unmatched_nodes.tolist():
+            name = node_names[node_index]
+            # The default name is the prefix, the side and the node index, the index is replaced by a free number
+            stem = name[:len(name) - len(str(node_index))]
+
+            while name in taken_names:
+                name = stem + str(next_number)
+                next_number += 1
+
+            node_names[node_index] = name
+            taken_names.add(name)
+
+    part.node_names = node_names.tolist()
+
+
+def patch_nodes(text, section, file_nodes, first_nodes, node_files, part, settings, edits, counts):
+    matched = np.flatnonzero(node_files != -1)
+    kept = np.zeros(len(first_nodes), dtype=bool)
+    kept[node_files[matched]] = True
+
+    # Rows of nodes which are not in the part anymore, rows repeating the name of a kept node are left alone
+    for row_index in file_nodes.row_indices[~kept[first_nodes]].tolist():
+        edits.append(get_row_deletion(text, *section.get_span(text, row_index)) + ('',))
+        counts['removed nodes'] += 1
+
+    moved = matched[(file_nodes.positions[node_files[matched]] != part.positions[matched]).any(axis=1)]
+
+    if len(moved):
+        positions = part.positions[moved]
+        xs, ys, zs = (core.format_numbers(positions[:, axis], part.decimals, settings.trim_zeros) for axis in range(3))
+
+        for row_index, x, y, z in zip(file_nodes.row_indices[node_files[moved]].tolist(), xs, ys, zs):
+            start, end = section.get_span(text, row_index)
+            (x_start, _), _, (_, z_end) = get_value_spans(text, start, end, 4)[1:4]
+            edits.append((x_start, z_end, '%s,%s,%s' % (x, y, z)))
+
+        counts['moved nodes'] += len(moved)
+
+    new_nodes = np.flatnonzero(node_files == -1)
+
+    if len(new_nodes):
+        indent, position, prefix = get_row_insertion(text, section)
+        positions = part.positions[new_nodes]
+        xs, ys, zs = (core.format_numbers(positions[:, axis], part.decimals, settings.trim_zeros) for axis in range(3))
+        lines = [prefix]
+        current_group_id = None
+
+        for node_index, x, y, z in zip(new_nodes.tolist(), xs, ys, zs):
+            group_id = int(part.group_ids[node_index])
+
+            # The last group of the file would apply to the new nodes, so the first one always gets its group
+            if settings.node_groups and group_id != current_group_id:
+                lines.append('%s{"group":%s},\n' % (indent, part.get_group_value(group_id)))
+                current_group_id = group_id
+
+            lines.append('%s["%s",%s,%s,%s],\n' % (indent, part.node_names[node_index], x, y, z))
+
+        if settings.node_groups and current_group_id != -1:
+            lines.append('%s{"group":""},\n' % indent)
+
+        edits.append((position, position, ''.join(lines)))
+        counts['added nodes'] += len(new_nodes)
+
+
+# Rows of a beams or triangles section compared with the rows of the part: `part_aligned` part rows are in the file
+# in the same order (see get_alignments()), the other rows of the file are `left`, with the file nodes of their
+# names as `left_nodes`, -1 for names which are not nodes
+ConnectionRows = collections.namedtuple('ConnectionRows', ('part_aligned', 'left', 'left_nodes'))
+
+
+# `column_keys` are the keys of the names of every column of the rows of the file (see NameTable.get_keys()),
+# `node_files` the file node of every node of the part
+def compare_connections(column_keys, name_table, node_files, connections):
+    file_count = len(column_keys[0])
+    aligned = np.zeros(file_count, dtype=bool)
+    part_aligned = np.zeros(len(connections), dtype=bool)
+    connection_files = node_files[connections]
+
+    for indices, file_indices in get_alignments(len(connections), file_count):
+        same = ~part_aligned[indices] & ~aligned[file_indices]
+
+        for column, keys in enumerate(column_keys):
+            same &= name_table.is_name(keys, file_indices, connection_files[indices, column])
+
+        part_aligned[indices[same]] = True
+        aligned[file_indices[same]] = True
+
+    left = np.flatnonzero(~aligned)
+    left_nodes = np.stack([name_table.get_nodes(keys, left) for keys in column_keys], axis=1) \
+        .reshape(-1, len(column_keys))
+
+    return ConnectionRows(part_aligned, left, left_nodes)
+
+
+# Beams and triangles are matched by their set of nodes, with integer keys (see get_connection_keys()), rows
+# in the order of the part are kept without looking further (see compare_connections()).
+# `node_indices` is the node index of every file node, and -1 for index -1. Rows using names which are neither
+# nodes of the part nor nodes of the file are left alone, they use nodes of other parts.
+# New rows go right after the header row
+def patch_connections(text, section, file_connections, rows, node_indices, name, part, connections, edits, counts):
+    part_left = np.flatnonzero(~rows.part_aligned)
+
+    if not len(rows.left) and not len(part_left):
+        return
+
+    size = connections.shape[1]
+    file_rows = node_indices[rows.left_nodes]
+    known = (file_rows != -1).all(axis=1)
+    keys = get_connection_keys(np.concatenate((connections, file_rows[known])), max(part.node_count, 1))
+    keys, file_keys = keys[:len(connections)], keys[len(connections):]
+
+    # Rows of the part's nodes which are not in the part anymore, and rows using removed nodes
+    removed = np.zeros(len(rows.left), dtype=bool)
+    removed[known] = ~is_in(file_keys, keys)
+    removed[~known] = (rows.left_nodes[~known] != -1).all(axis=1)
+
+    for row_index in file_connections.row_indices[rows.left[removed]].tolist():
+        edits.append(get_row_deletion(text, *section.get_span(text, row_index)) + ('',))
+
+    counts['removed ' + name] += int(removed.sum())
+    missing = part_left[~is_in(keys[part_left], np.concatenate((keys[rows.part_aligned], file_keys)))]
+
+    if len(missing):
+        indent, position, prefix = get_header_insertion(text, section, file_connections.header_row)
+        line = indent + '[' + ','.join(['"%s"'] * size) + '],\n'
+        node_names = part.node_names
+        new_rows = ''.join([line % tuple(node_names[i] for i in connection)
+                            for connection in connections[missing].tolist()])
+
+        edits.append((position, position, prefix + new_rows))
+        counts['added ' + name] += len(missing)
+
+
+# Returns the edits, (start, end, replacement) sorted by position, turning `text` into the patched file,
+# and what changed. Returns None when the part isn't in the file
+def get_patch(text, part, settings):
+    row_lines = RowLines.find(text)
+    scanned = scan_part(text, part.name, row_lines)
+
+    if scanned is None:
+        return None
+
+    sections, part_end = scanned
+    edits = []
+    counts = dict.fromkeys(('moved nodes', 'added nodes', 'removed nodes', 'added beams', 'removed beams',
+                            'added triangles', 'removed triangles'), 0)
+    # Sections missing from the file are written whole before the end of the part
+    missing_sections = []
+
+    data = row_lines.data if row_lines is not None else None
+    file_nodes = read_file_nodes(text, sections['nodes'], part.decimals) if 'nodes' in sections else None
+    file_connections = {section_name: read_file_connections(text, sections[section_name], size)
+                        for section_name, size in (('beams', 2), ('triangles', 3)) if section_name in sections}
+
+    # Names of the beams and triangles of the file are found as file nodes, without nodes in the file
+    # they are found as nodes of the export
+    if file_nodes is not None:
+        name_table = NameTable(data, file_nodes.names, file_nodes.row_indices)
+    else:
+        ascii_names = all(name.isascii() for name in part.node_names)
+        name_table = NameTable(data if ascii_names else None, [part.node_names], np.arange(part.node_count))
+
+    column_keys = {section_name: [name_table.get_keys(sources) for sources in connections.names]
+                   for section_name, connections in file_connections.items()}
+
+    if file_nodes is not None:
+        node_files = match_nodes(part, file_nodes, column_keys.get('beams'), name_table)
+    else:
+        node_files = name_table.first_nodes
+
+    rows = {section_name: compare_connections(column_keys[section_name], name_table, node_files, connections)
+            for section_name, connections in (('beams', part.beams), ('triangles', part.triangles))
+            if section_name in file_connections}
+
+    if file_nodes is not None:
+        other_names = set()
+
+        for section_name, section_rows in rows.items():
+            for sources, nodes in zip(file_connections[section_name].names, section_rows.left_nodes.T):
+                other_names.update(name_table.get_source_names(select_names(sources, section_rows.left[nodes == -1])))
+
+        keep_node_names(part, node_files, other_names, name_table)
+
+    # Node index of every file node, and -1 for index -1
+    node_indices = np.full(len(name_table.first_nodes) + 1, -1, dtype=np.int64)
+    matched = np.flatnonzero(node_files != -1)
+    node_indices[node_files[matched]] = matched
+
+    if settings.nodes:
+        if file_nodes is not None:
+            patch_nodes(text, sections['nodes'], file_nodes, name_table.first_nodes, node_files, part, settings,
+                        edits, counts)
+        else:
+            missing_sections.append(core.iter_nodes(part, 'jbeam', settings.node_groups, settings.trim_zeros))
+            counts['added nodes'] += part.node_count
+
+    for section_name, connections, iter_section in (('beams', part.beams, core.iter_beams),
+                                                    ('triangles', part.triangles, core.iter_triangles)):
+        if not getattr(settings, section_name):
+            continue
+
+        if section_name in sections:
+            patch_connections(text, sections[section_name], file_connections[section_name], rows[section_name],
+                              node_indices, section_name, part, connections, edits, counts)
+        elif len(connections):
+            missing_sections.append(iter_section(part, 'jbeam'))
+            counts['added ' + section_name] += len(connections)
+
+    if missing_sections:
+        line_start = text.rfind('\n', 0, part_end) + 1
+        position = line_start if text[line_start:part_end].strip() == '' else part_end
+        edits.append((position, position, ''.join(''.join(section) for section in missing_sections)))
+
+    # New rows use the line endings of the file, the ending of its first line
+    first_line_end = text.find('\n')
+
+    if first_line_end > 0 and text[first_line_end - 1] == '\r':
+        edits = [(start, end, replacement.replace('\n', '\r\n')) for start, end, replacement in edits]
+
+    edits.sort(key=lambda edit: (edit[0], edit[1]))
+
+    return edits, counts
+
+def iter_patched(text, edits):
+    position = 0
+
+    for start, end, replacement in edits:
+        yield text[position:start]
+        yield replacement
+        position = end
+
+    yield text[position:]
+
+
+# Patches the part into the existing JBeam file `filepath`.
+# Returns what changed, an empty dict if the file is already up to date, or None if the part isn't in the file.
+# The new file is written next to the old one and swapped in, after `before_write()` (used for backups)
+def patch_file(part, filepath, settings, before_write=None):
+    # Line endings are kept as they are, get_row_deletion() and get_row_insertion() handle '\r\n'
+    with open(filepath, 'rt', encoding='utf-8', newline='') as jbeam_file:
+        text = jbeam_file.read()
+
+    patch = get_patch(text, part, settings)
+
+    if patch is None:
+        return None
+
+    edits, counts = patch
+
+    if not edits:
+        return {}
+
+    temporary_path = filepath + '.tmp'
+
+    with open(temporary_path, 'wt', encoding='utf-8', newline='') as jbeam_file:
+        jbeam_file.writelines(iter_patched(text, edits))
+
+    if before_write is not None:
+        before_write()
+
+    os.replace(temporary_path, filepath)
+
+    return {change: count for change, count in counts.items() if count}
@@ -0,0 +1,357 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Tolerant, streaming JBeam reader.
+# JBeam is relaxed JSON: // and /* */ comments, trailing commas and missing commas are all allowed.
+# The file is read in chunks and tokenized with a single regular expression, values are built with
+# an explicit stack, so big files are never held as one string.
+# Does not depend on bpy.
+
+import itertools
+import json
+import re
+
+import numpy as np
+
+from . import core
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Imported positions are rounded to this many decimals, more than Blender's single precision keeps anyway
+IMPORT_DECIMALS = 6
+
+# Arrays of strings and numbers on a single line, like node, beam and triangle rows, one after the other.
+# Most of a file is made of these, they are matched as a single token and parsed by json.loads() at once.
+# A block may be cut anywhere between two rows by the chunk boundary, the next block simply continues it
+ROWS = r'(?:\[[^\[\]{}/"\n]*(?:"[^"\\\n]*"[^\[\]{}/"\n]*)*\][\s,]*)+'
+ROW = re.compile(r'\[[^\[\]{}/"\n]*(?:"[^"\\\n]*"[^\[\]{}/"\n]*)*\]')
+
+SCALARS = r'''
+    (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<literal>true|false|null|NaN|-?Infinity)
+'''
+
+# Commas and colons are separators only, they are skipped like whitespace and comments
+TOKEN = re.compile(r'''
+    (?P<rows>%s)
+  | %s
+  | (?P<open_object>\{)
+  | (?P<close_object>\})
+  | (?P<open_array>\[)
+  | (?P<close_array>\])
+  | (?P<skip>(?:\s|[,:]|//[^\n]*|/\*.*?\*/)+)
+  | (?P<error>.)
+''' % (ROWS, SCALARS), re.VERBOSE | re.DOTALL)
+
+# Values inside a row
+ROW_TOKEN = re.compile(r'''
+    %s
+  | (?P<skip>[\s,:]+)
+  | (?P<error>.)
+''' % SCALARS, re.VERBOSE | re.DOTALL)
+
+# A match ending less than this many characters before the end of the buffer may be the start of
+# a longer token cut by the chunk boundary ("1.5" of "1.5e+3")
+TOKEN_LOOKAHEAD = 3
+
+LITERALS = {
+    'true': True,
+    'false': False,
+    'null': None,
+    'NaN': float('nan'),
+    'Infinity': float('inf'),
+    '-Infinity': float('-inf'),
+}
+
+
+class JBeamSyntaxError(ValueError):
+    def __init__(self, message, line):
+        super().__init__('%s (line %d)' % (message, line))
+        self.line = line
+
+
+# Yields the match of every token of a file, skipping whitespace, comments and separators.
+# A token close to the end of the buffer may be cut by the chunk boundary, it is kept for the next chunk
+class Tokenizer(object):
+    def __init__(self, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        # Line number of the first character of the current buffer
+        self.line = 1
+
+    # Line number of a match of the current buffer, only used for error messages
+    def get_line(self, match):
+        return self.line + match.string.count('\n', 0, match.start())
+
+    def __iter__(self):
+        buffer = ''
+        end_of_file = False
+
+        while not end_of_file:
+            chunk = self.file.read(self.chunk_size)
+            end_of_file = not chunk
+            buffer += chunk
+            position = 0
+
+            for match in TOKEN.finditer(buffer):
+                kind = match.lastgroup
+
+                if not end_of_file and kind != 'rows' and \
+                        (len(buffer) - match.end() < TOKEN_LOOKAHEAD or kind == 'error'):
+                    # Maybe a string, number or comment cut in two, wait for the next chunk
+                    break
+
+                position = match.end()
+
+                if kind == 'skip':
+                    continue
+
+                if kind == 'error':
+                    raise JBeamSyntaxError('Unexpected character %r' % match.group(), self.get_line(match))
+
+                yield match
+
+            self.line += buffer.count('\n', 0, position)
+            buffer = buffer[position:]
+
+
+def parse_string(text):
+    if '\\' in text:
+        return json.loads(text)
+
+    return text[1:-1]
+
+
+def parse_number(text):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+
+    return int(text)
+
+
+def parse_scalar(kind, text):
+    if kind == 'string':
+        return parse_string(text)
+    elif kind == 'number':
+        return parse_number(text)
+    else:
+        return LITERALS[text]
+
+
+# Parses the text of a `rows` token, returns a list of rows.
+# `get_line` returns the line number of the start of the text, it is only called for errors
+def parse_rows(text, get_line):
+    try:
+        return json.loads('[' + text.rstrip().rstrip(',') + ']')
+    except ValueError:
+        pass
+
+    # Missing or trailing commas, parse the rows value by value
+    rows = []
+
+    for row in ROW.finditer(text):
+        values = []
+
+        for value in ROW_TOKEN.finditer(text, row.start() + 1, row.end() - 1):
+            if value.lastgroup == 'error':
+                raise JBeamSyntaxError('Unexpected character %r' % value.group(),
+                                       get_line() + text.count('\n', 0, value.start()))
+
+            if value.lastgroup != 'skip':
+                values.append(parse_scalar(value.lastgroup, value.group()))
+
+        rows.append(values)
+
+    return rows
+
+
+# Parses a whole JBeam file (a text file object) into dicts and lists
+def parse(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    root = None
+    has_root = False
+    # Open objects and arrays, and the pending key of the innermost object
+    stack = []
+    key = None
+
+    tokens = Tokenizer(file, chunk_size)
+
+    for match in tokens:
+        kind = match.lastgroup
+
+        if kind == 'close_object' or kind == 'close_array':
+            if not stack or isinstance(stack[-1], dict) != (kind == 'close_object'):
+                raise JBeamSyntaxError('Unexpected %r' % match.group(), tokens.get_line(match))
+
+            if key is not None:
+                raise JBeamSyntaxError('Missing value for key "%s"' % key, tokens.get_line(match))
+
+            stack.pop()
+            continue
+
+        if kind == 'rows':
+            values = parse_rows(match.group(), lambda: tokens.get_line(match))
+
+            if stack and isinstance(stack[-1], list):
+                stack[-1].extend(values)
+                continue
+        elif kind == 'open_object':
+            values = ({},)
+        elif kind == 'open_array':
+            values = ([],)
+        else:
+            values = (parse_scalar(kind, match.group()),)
+
+        for value in values:
+            if not stack:
+                if has_root:
+                    raise JBeamSyntaxError('More than one value at the top level', tokens.get_line(match))
+
+                root = value
+                has_root = True
+            elif isinstance(stack[-1], list):
+                stack[-1].append(value)
+            elif key is None:
+                if isinstance(value, (dict, list)):
+                    raise JBeamSyntaxError('Expected a key', tokens.get_line(match))
+
+                key = str(value)
+            else:
+                stack[-1][key] = value
+                key = None
+
+        if kind == 'open_object' or kind == 'open_array':
+            stack.append(values[0])
+
+    if stack:
+        raise JBeamSyntaxError('Unexpected end of file, %d unclosed bracket(s)' % len(stack), tokens.line)
+
+    if not has_root:
+        raise JBeamSyntaxError('Empty file', 1)
+
+    return root
+
+
+# Builds a core.JBeamPart from the parsed data of one part, with the node names of the file.
+# Beams and triangles using nodes of other parts can't be imported,
+# returns the part and the number of those skipped rows
+def get_jbeam_part(name, data):
+    group_names = []
+    group_sets = {}
+
+    def get_group_id(group):
+        if not group:
+            return -1
+
+        if isinstance(group, str):
+            group = [group]
+
+        group_set = []
+
+        for group_name in group:
+            if group_name not in group_names:
+                group_names.append(group_name)
+
+            group_set.append(group_names.index(group_name))
+
+        return group_sets.setdefault(tuple(group_set), len(group_sets))
+
+    node_rows = []
+    # (first node row, group id) every time the current group changes, and nodes with their own group
+    group_changes = []
+    node_groups = []
+
+    for row in data.get('nodes', []):
+        if type(row) is list:
+            # Skips the header (["id", "posX", "posY", "posZ"]) and anything that isn't a node
+            if len(row) < 4 or isinstance(row[1], str):
+                continue
+
+            # Inline modifiers only apply to this node
+            if len(row) > 4 and isinstance(row[4], dict) and 'group' in row[4]:
+                node_groups.append((len(node_rows), get_group_id(row[4]['group'])))
+
+            node_rows.append(row)
+        elif isinstance(row, dict) and 'group' in row:
+            group_changes.append((len(node_rows), get_group_id(row['group'])))
+
+    group_ids = np.full(len(node_rows), -1, dtype=np.int64)
+
+    for (start, group_id), (stop, _) in zip(group_changes, group_changes[1:] + [(len(node_rows), None)]):
+        group_ids[start:stop] = group_id
+
+    for node_index, group_id in node_groups:
+        group_ids[node_index] = group_id
+
+    node_ids = [row[0] for row in node_rows]
+    positions = [row[1:4] for row in node_rows]
+    node_indices = dict(zip(node_ids, itertools.count()))
+    skipped = 0
+
+    # Returns the node indices of the rows of a section as a (N, size) array
+    def get_connections(section, size):
+        nonlocal skipped
+        rows = [row for row in data.get(section, []) if type(row) is list and len(row) >= size]
+
+        # Header (["id1:", "id2:"])
+        if rows and isinstance(rows[0][0], str) and rows[0][0].endswith(':'):
+            rows = rows[1:]
+
+        node_references = itertools.chain.from_iterable(row if len(row) == size else row[:size] for row in rows)
+        indices = np.fromiter(map(node_indices.get, node_references, itertools.repeat(-1)), dtype=np.int64,
+                              count=len(rows) * size).reshape(-1, size)
+        known = (indices != -1).all(axis=1)
+        skipped += len(indices) - int(known.sum())
+
+        return indices[known]
+
+    part = core.JBeamPart(name, np.array(positions, dtype=np.float64).reshape(-1, 3),
+                          group_ids=group_ids,
+                          group_names=group_names,
+                          beams=get_connections('beams', 2),
+                          triangles=get_connections('triangles', 3),
+                          decimals=IMPORT_DECIMALS,
+                          group_sets=sorted(group_sets, key=group_sets.get))
+    part.node_names = [str(node_id) for node_id in node_ids]
+    part.slot_type = data.get('slotType', 'main')
+
+    information = data.get('information')
+
+    if isinstance(information, dict):
+        part.information = {
+            'authors': information.get('authors', ''),
+            'name': information.get('name', name),
+            'value': information.get('value')
+        }
+
+    return part, skipped
+
+
+# Reads every part of a JBeam file, returns a list of (core.JBeamPart, skipped rows)
+def read_parts(filepath, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open(filepath, 'rt', encoding='utf-8') as jbeam_file:
+        data = parse(jbeam_file, chunk_size)
+
+    if not isinstance(data, dict):
+        raise JBeamSyntaxError('A JBeam file must contain an object of parts', 1)
+
+    return [get_jbeam_part(name, part_data) for name, part_data in data.items() if isinstance(part_data, dict)]
@@ -0,0 +1,284 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Update checks, downloads and installation, used by the updater from a background thread.
+# version.json holds one value per line: the addon version, the minimum Blender version, the URL of the
+# release zip and the SHA-256 checksum of that zip ("sha256:<hex digest>"). A release without checksum
+# is never installed.
+# Does not depend on bpy, every URL and path is a parameter so it can run against a local HTTP server.
+
+import collections
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+VERSION_URL = 'https://raw.githubusercontent.com/50thomatoes50/BlenderBeamNGExport/master/io_mesh_jbeam/version.json'
+
+# Seconds a connection or a single read may take, a stalled proxy fails instead of hanging
+DEFAULT_TIMEOUT = 10
+
+CHUNK_SIZE = 1 << 16
+
+# Release zips are a few hundred KB, anything much bigger is not a release
+MAX_DOWNLOAD_SIZE = 64 << 20
+
+CHECKSUM = re.compile(r'(?:sha256[:=\s]\s*)?([0-9a-fA-F]{64})$')
+
+Release = collections.namedtuple('Release', ('version', 'blender', 'url', 'checksum'))
+
+
+class UpdateError(Exception):
+    pass
+
+
+def parse_version(text):
+    try:
+        return tuple(int(number) for number in text.strip().split('.'))
+    except ValueError:
+        raise UpdateError('Invalid version %r' % text)
+
+
+def parse_version_file(text):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    if len(lines) < 3:
+        raise UpdateError('Invalid version file')
+
+    checksum = None
+
+    if len(lines) > 3:
+        match = CHECKSUM.match(lines[3])
+
+        if match is None:
+            raise UpdateError('Invalid checksum %r' % lines[3])
+
+        checksum = match.group(1).lower()
+
+    return Release(parse_version(lines[0]), parse_version(lines[1]), lines[2], checksum)
+
+
+# Last version file downloaded, stored as JSON in `path`: its URL, text, ETag and Last-Modified headers
+# and when it was checked. Within `ttl` seconds of the last check the network is not used at all,
+# after that the request is conditional and an unchanged file only costs a 304 Not Modified
+class VersionCache(object):
+    def __init__(self, path, ttl=0):
+        self.path = path
+        self.ttl = ttl
+        self.entry = {}
+
+        try:
+            with open(path, 'rt') as cache_file:
+                entry = json.load(cache_file)
+
+            if isinstance(entry, dict) and isinstance(entry.get('text'), str):
+                self.entry = entry
+        except (OSError, ValueError):
+            pass
+
+    def get_text(self, url):
+        if self.entry.get('url') == url:
+            return self.entry['text']
+
+        return None
+
+    def is_fresh(self, url):
+        return self.get_text(url) is not None and 0 <= time.time() - self.entry.get('checked', 0) < self.ttl
+
+    # Conditional request headers for `url`
+    def get_headers(self, url):
+        headers = {}
+
+        if self.get_text(url) is not None:
+            if self.entry.get('etag'):
+                headers['If-None-Match'] = self.entry['etag']
+
+            if self.entry.get('last_modified'):
+                headers['If-Modified-Since'] = self.entry['last_modified']
+
+        return headers
+
+    def update(self, url, text, etag=None, last_modified=None):
+        self.entry = {
+            'url': url,
+            'text': text,
+            'etag': etag,
+            'last_modified': last_modified,
+            'checked': time.time(),
+        }
+
+        temporary_path = self.path + '.tmp'
+
+        with open(temporary_path, 'wt') as cache_file:
+            json.dump(self.entry, cache_file, indent=2)
+
+        os.replace(temporary_path, self.path)
+
+
+# Returns the latest Release, from `version_cache` (a VersionCache) when it is fresh or the file did not change
+def fetch_release(url=VERSION_URL, timeout=DEFAULT_TIMEOUT, version_cache=None):
+    if version_cache is None:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return parse_version_file(response.read(1 << 16).decode('ascii', errors='replace'))
+
+    if version_cache.is_fresh(url):
+        return parse_version_file(version_cache.get_text(url))
+
+    request = urllib.request.Request(url, headers=version_cache.get_headers(url))
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            text = response.read(1 << 16).decode('ascii', errors='replace')
+            release = parse_version_file(text)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+
+        text = version_cache.get_text(url)
+        release = parse_version_file(text)
+        # A 304 may leave out the validators, the cached ones still apply
+        etag = e.headers.get('ETag') or version_cache.entry.get('etag')
+        last_modified = e.headers.get('Last-Modified') or version_cache.entry.get('last_modified')
+
+    try:
+        version_cache.update(url, text, etag, last_modified)
+    except OSError as e:
+        print('Could not save the update check cache: ' + str(e))
+
+    return release
+
+
+# Streams `url` into the file `path` by chunks and checks its SHA-256 digest. The file is deleted on error
+def download(url, path, checksum, timeout=DEFAULT_TIMEOUT, chunk_size=CHUNK_SIZE, max_size=MAX_DOWNLOAD_SIZE):
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response, open(path, 'wb') as file:
+            while True:
+                chunk = response.read(chunk_size)
+
+                if not chunk:
+                    break
+
+                size += len(chunk)
+
+                if size > max_size:
+                    raise UpdateError('Download bigger than %d MB' % (max_size >> 20))
+
+                digest.update(chunk)
+                file.write(chunk)
+
+        if digest.hexdigest() != checksum:
+            raise UpdateError('Checksum mismatch, the download is corrupted or was tampered with')
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    return size
+
+
+# Extracts the release zip next to the addon folder and swaps the folders with two renames.
+# The zip must contain a single folder with an __init__.py, installed under the name of `addon_directory`.
+# The old folder is restored if the swap fails
+def install_release(zip_path, addon_directory):
+    addon_directory = os.path.abspath(addon_directory)
+    parent_directory = os.path.dirname(addon_directory)
+    name = os.path.basename(addon_directory)
+    staging_directory = tempfile.mkdtemp(prefix='.%s_update_' % name, dir=parent_directory)
+    old_directory = os.path.join(staging_directory, 'old')
+
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            members = archive.namelist()
+            top_directories = {member.replace('\\', '/').split('/')[0] for member in members}
+
+            if len(top_directories) != 1 or \
+                    any(os.path.isabs(member) or '..' in member.replace('\\', '/').split('/') for member in members):
+                raise UpdateError('Unexpected release archive layout')
+
+            top_directory = top_directories.pop()
+
+            if top_directory + '/__init__.py' not in members:
+                raise UpdateError('The release archive does not contain an addon')
+
+            archive.extractall(os.path.join(staging_directory, 'new'))
+
+        os.rename(addon_directory, old_directory)
+
+        try:
+            os.rename(os.path.join(staging_directory, 'new', top_directory), addon_directory)
+        except OSError:
+            os.rename(old_directory, addon_directory)
+            raise
+    except zipfile.BadZipfile:
+        raise UpdateError('The release archive is corrupted')
+    finally:
+        shutil.rmtree(staging_directory, ignore_errors=True)
+
+
+UpdateResult = collections.namedtuple('UpdateResult', ('status', 'release', 'message'))
+
+
+# Checks for a new release and, with `install`, installs it. Runs in a background thread.
+# status is 'up_to_date', 'blender_outdated', 'available' (not installed) or 'updated',
+# errors raise UpdateError or OSError
+def update(current_version, blender_version, addon_directory, version_url=VERSION_URL, timeout=DEFAULT_TIMEOUT,
+           version_cache=None, install=True):
+    release = fetch_release(version_url, timeout, version_cache)
+
+    if release.version <= tuple(current_version):
+        return UpdateResult('up_to_date', release, 'Addon is up to date')
+
+    if release.blender > tuple(blender_version):
+        return UpdateResult('blender_outdated', release, 'Blender is outdated, the new version needs Blender ' +
+                            '.'.join(map(str, release.blender)))
+
+    if not install:
+        return UpdateResult('available', release, 'Version %s is available' % '.'.join(map(str, release.version)))
+
+    if release.checksum is None:
+        raise UpdateError('Version %s has no published checksum, install it manually' %
+                          '.'.join(map(str, release.version)))
+
+    print('Found new version {}, downloading from {}...'.format('.'.join(map(str, release.version)), release.url))
+
+    file_descriptor, zip_path = tempfile.mkstemp(suffix='.zip')
+    os.close(file_descriptor)
+
+    try:
+        download(release.url, zip_path, release.checksum, timeout)
+        install_release(zip_path, addon_directory)
+    finally:
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
+
+    return UpdateResult('updated', release, 'Update done ' + '.'.join(map(str, release.version)))
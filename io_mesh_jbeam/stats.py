@@ -0,0 +1,155 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Optional export statistics: wall time of every stage of every part, element counts and file sizes.
+# When statistics are disabled the exporter uses NO_STATS, which does nothing.
+# Does not depend on bpy.
+
+import contextlib
+import json
+import os
+import time
+
+REPORT_NAME = '.jbeam_export_report.json'
+
+STAGES = ('extract', 'beams', 'diagonals', 'triangles', 'sort', 'name', 'backup', 'write')
+
+
+class PartStats(object):
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.nodes = 0
+        self.beams = 0
+        self.triangles = 0
+        self.bytes = 0
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def count(self, part):
+        self.nodes = part.node_count
+        self.beams = len(part.beams)
+        self.triangles = len(part.triangles)
+
+    def measure_file(self, filepath):
+        self.bytes = os.path.getsize(filepath)
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'stages': self.stages,
+            'total': self.total,
+            'nodes': self.nodes,
+            'beams': self.beams,
+            'triangles': self.triangles,
+            'bytes': self.bytes,
+        }
+
+
+class NoStats(object):
+    # Stands in for PartStats when statistics are disabled
+    _null_context = contextlib.nullcontext()
+
+    def stage(self, stage):
+        return self._null_context
+
+    def count(self, part):
+        pass
+
+    def measure_file(self, filepath):
+        pass
+
+
+NO_STATS = NoStats()
+
+
+class ExportStats(object):
+    def __init__(self):
+        self.parts = []
+        self.start = time.perf_counter()
+        self.wall_time = 0.0
+
+    def add_part(self, name):
+        part_stats = PartStats(name)
+        self.parts.append(part_stats)
+        return part_stats
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self.start
+
+    def to_dict(self):
+        stage_totals = {}
+
+        for part_stats in self.parts:
+            for stage, seconds in part_stats.stages.items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+        return {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'wall_time': self.wall_time,
+            'stages': stage_totals,
+            'nodes': sum(part_stats.nodes for part_stats in self.parts),
+            'beams': sum(part_stats.beams for part_stats in self.parts),
+            'triangles': sum(part_stats.triangles for part_stats in self.parts),
+            'bytes': sum(part_stats.bytes for part_stats in self.parts),
+            'parts': [part_stats.to_dict() for part_stats in self.parts],
+        }
+
+    def summary(self):
+        report = self.to_dict()
+        slowest = max(self.parts, key=lambda part_stats: part_stats.total, default=None)
+
+        text = '%d part(s) in %.2fs: %d nodes, %d beams, %d triangles, %.1f KB' % (
+            len(self.parts), self.wall_time, report['nodes'], report['beams'], report['triangles'],
+            report['bytes'] / 1024.0)
+
+        if slowest is not None:
+            text += ', slowest: %s (%.2fs)' % (slowest.name, slowest.total)
+
+        return text
+
+    def print_table(self):
+        print('%-32s ' % 'part' + ' '.join('%9s' % stage for stage in STAGES) + ' %9s' % 'total')
+
+        for part_stats in self.parts:
+            print('%-32s ' % part_stats.name[:32] +
+                  ' '.join('%9.3f' % part_stats.stages.get(stage, 0.0) for stage in STAGES) +
+                  ' %9.3f' % part_stats.total)
+
+    def save(self, directory):
+        path = os.path.join(directory, REPORT_NAME)
+
+        with open(path, 'wt') as report:
+            json.dump(self.to_dict(), report, indent=2)
+
+        return path
@@ -20,15 +20,18 @@
 
 # <pep8-80 compliant>
 
-import io
 import bpy
+import functools
 import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
 
 from .utils import *
 
 updater_supported = True
 try:
-    import urllib.request, urllib.error, zipfile
+    import urllib.request, urllib.error
+    from . import release
 except:
     updater_supported = False
 
@@ -41,6 +44,42 @@ class MENU_MT_jbeam_updated(bpy.types.Menu):
                              icon='TEXT').url = "https://github.com/50thomatoes50/BlenderBeamNGExport/blob/master/CHANGELOG.md"
 
 
+# Last downloaded version file, kept in Blender's user config folder (the addon folder is replaced on update)
+CACHE_NAME = 'jbeam_exporter_update.json'
+
+
+def get_preferences():
+    addon = bpy.context.preferences.addons.get(__package__)
+
+    return addon.preferences if addon is not None else None
+
+
+def get_version_cache():
+    preferences = get_preferences()
+    ttl = preferences.update_check_interval * 3600 if preferences is not None else 0
+    directory = bpy.utils.user_resource('CONFIG')
+    os.makedirs(directory, exist_ok=True)
+
+    return release.VersionCache(os.path.join(directory, CACHE_NAME), ttl)
+
+
+# Runs release.update() in a background thread and a timer reporting the result.
+# Without `install`, only checks and remembers the available version (silent startup check)
+def start_update(install=True):
+    global update_future
+
+    version_cache = get_version_cache()
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    update_future = executor.submit(release.update, get_addon_version(), bpy.app.version,
+                                    os.path.dirname(os.path.abspath(__file__)), version_cache=version_cache,
+                                    install=install)
+    # Does not wait, the thread ends with the update
+    executor.shutdown(wait=False)
+
+    bpy.app.timers.register(functools.partial(poll_update, not install), first_interval=0.2)
+
+
 class SCRIPT_OT_jbeam_update(bpy.types.Operator):
     bl_idname = "script.jbeam_update"
     bl_label = "JBeam Exporter Updater"
@@ -48,54 +87,75 @@ class SCRIPT_OT_jbeam_update(bpy.types.Operator):
 
     @classmethod
     def poll(self, context):
-        return updater_supported
+        return updater_supported and (update_future is None or update_future.done())
 
     def execute(self, context):
         print("Checking JBeam Exporter addon updates...")
+        start_update()
+
+        self.report({'INFO'}, "Checking for updates...")
+        return {'FINISHED'}
+
+
+# Future of the running update check
+update_future = None
+# Version found by the startup check, shown in the About panel
+available_version = None
+
+
+# Timer callback reporting the result of the update check, in the console only when `silent`
+def poll_update(silent=False):
+    global available_version
+
+    if not update_future.done():
+        return 0.2
+
+    try:
+        result = update_future.result()
+    except urllib.error.URLError as err:
+        message = ('ERROR', "update err download failed : " + str(err.reason))
+    except socket.timeout:
+        message = ('ERROR', "update err download failed : timed out")
+    except release.UpdateError as err:
+        message = ('ERROR', "update err : " + str(err))
+    except (OSError, ValueError) as err:
+        message = ('ERROR', "update err unknown : " + str(err))
+    else:
+        available_version = result.release.version if result.status == 'available' else None
+
+        if result.status == 'updated':
+            print(result.message)
+            bpy.ops.wm.call_menu(name="MENU_MT_jbeam_updated")
+            return None
+
+        if result.status == 'up_to_date':
+            message = ('INFO', "Addon is up to date: v" + print_version())
+        else:
+            message = ('INFO' if result.status == 'available' else 'ERROR', result.message)
 
-        cur_version = get_addon_version()
-        version_url = "https://raw.githubusercontent.com/50thomatoes50/BlenderBeamNGExport/master/io_mesh_jbeam/version.json"
+    print(message[1])
 
-        try:
-            data = urllib.request.urlopen(version_url).read().decode(
-                'ASCII').split("\n")
-            remote_ver = data[0].strip().split(".")
-            remote_bpy = data[1].strip().split(".")
-            download_url = data[2].strip()
+    if not silent:
+        show_messages("JBeam Exporter Updater", [message])
 
-            for i in range(min(len(remote_bpy), len(bpy.app.version))):
-                if int(remote_bpy[i]) > bpy.app.version[i]:
-                    self.report({'ERROR'}, "Blender is outdated. min ver:" + print_version(remote_bpy))
-                    return {'FINISHED'}
+    return None
 
-            for i in range(min(len(remote_ver), len(cur_version))):
-                try:
-                    diff = int(remote_ver[i]) - int(cur_version[i])
-                except ValueError:
-                    continue
 
-                if diff > 0:
-                    print(
-                        "Found new version {}, downloading from {}...".format(print_version(remote_ver), download_url))
+# Timer callback of the startup check, the preferences are not available yet while the addon registers
+def check_on_startup():
+    preferences = get_preferences()
 
-                    file = zipfile.ZipFile(io.BytesIO(urllib.request.urlopen(download_url).read()))
-                    file.extractall(path=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    if updater_supported and preferences is not None and preferences.check_updates_on_startup:
+        start_update(install=False)
 
-                    self.report({'INFO'}, "Update done " + print_version(remote_ver))
-                    bpy.ops.wm.call_menu(name="MENU_MT_jbeam_updated")
-                    return {'FINISHED'}
+    return None
 
-            self.report({'INFO'}, "Addon is up to date: v" + print_version())
-            return {'FINISHED'}
 
-        except urllib.error.URLError as err:
-            self.report({'ERROR'}, " ".join(["update err download failed : " + str(err)]))
-            return {'CANCELLED'}
+def register():
+    if not bpy.app.background:
+        bpy.app.timers.register(check_on_startup, first_interval=1.0)
 
-        except zipfile.BadZipfile:
-            self.report({'ERROR'}, "update err corruption")
-            return {'CANCELLED'}
 
-        except IOError as err:
-            self.report({'ERROR'}, " ".join(["update err unknown : ", str(err)]))
-            return {'CANCELLED'}
+def unregister():
+    if bpy.app.timers.is_registered(check_on_startup):
+        bpy.app.timers.unregister(check_on_startup)
@@ -1,6 +1,7 @@
 import sys
 import os
 import bpy
+import numpy as np
 from os.path import expanduser
 
 
@@ -28,18 +29,21 @@ def get_exportable_mesh_count():
     return num
 
 
-def get_vertex_group_id(groups):
-    if len(groups) == 0:
-        return -1
-    else:
-        return groups[0].group
+# Reads the vertex group assignments of the mesh in one pass, as a sparse vertex x group table:
+# two arrays holding the vertex index and the group index of every assignment, sorted by vertex.
+# Without vertex groups on the object, no vertex is read
+def get_vertex_group_table(obj, mesh):
+    if len(obj.vertex_groups) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
 
+    vertex_groups = [[element.group for element in vertex.groups] for vertex in mesh.vertices]
+    counts = np.fromiter(map(len, vertex_groups), dtype=np.int64, count=len(vertex_groups))
 
-def get_vertex_group_name(obj, groups):
-    if len(groups) == 0:
-        return ""
-    else:
-        return obj.vertex_groups[groups[0].group].name
+    vertex_indices = np.repeat(np.arange(len(vertex_groups), dtype=np.int64), counts)
+    group_indices = np.fromiter((group for groups in vertex_groups for group in groups), dtype=np.int64,
+                                count=int(counts.sum()))
+
+    return vertex_indices, group_indices
 
 
 def get_beamng_mod_path():
@@ -47,5 +51,20 @@ def get_beamng_mod_path():
     return expanduser("~") + sep + 'Documents' + sep + 'BeamNG.drive' + sep + 'mods' + sep + 'unpacked' + sep
 
 
+# Shows (icon, message) pairs in a popup, reports results outside of an operator (from a timer)
+def show_messages(title, messages):
+    window_manager = bpy.context.window_manager
+
+    if window_manager is None or not messages:
+        return
+
+    def draw(menu, context):
+        for icon, message in messages:
+            menu.layout.label(text=message, icon=icon)
+
+    window_manager.popup_menu(draw, title=title,
+                              icon='ERROR' if any(icon == 'ERROR' for icon, _ in messages) else 'INFO')
+
+
 def save_prefs(self, context):
     bpy.ops.wm.save_userpref()
@@ -0,0 +1,197 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Watch mode: .jbeam objects are exported again a short time after they change.
+# A depsgraph_update_post handler only records which objects had their geometry or transform changed,
+# a bpy.app.timers callback exports them once no change came for `watch_delay` seconds, so a burst of edits
+# is exported once. Mesh data is read in the timer, sorting, formatting and writing run in a background thread.
+# Objects in edit mode are left alone, leaving edit mode updates the mesh and triggers the export.
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+from bpy.app.handlers import persistent
+
+from .utils import *
+from . import cache
+from . import core
+from . import export_jbeam
+
+# Object name -> time of the last change
+dirty_objects = {}
+# Object name -> (file path, Future) of the export running in the background
+running_exports = {}
+# File path -> fingerprint of the last export, unchanged parts are not written again
+exported_fingerprints = {}
+executor = None
+
+
+def get_export_directory(scene):
+    export_path = scene.jbeam.export_path
+
+    if not export_path or (export_path.startswith('//') and not bpy.data.filepath):
+        return None
+
+    return bpy.path.abspath(export_path)
+
+
+@persistent
+def depsgraph_update_post_handler(scene, depsgraph=None):
+    if not scene.jbeam.watch_mode or depsgraph is None:
+        return
+
+    now = time.monotonic()
+    changed = False
+
+    for update in depsgraph.updates:
+        obj = update.id
+
+        if isinstance(obj, bpy.types.Object) and obj.type == 'MESH' and '.jbeam' in obj.name and \
+                (update.is_updated_geometry or update.is_updated_transform):
+            dirty_objects[obj.original.name] = now
+            changed = True
+
+    if changed and not bpy.app.timers.is_registered(export_dirty_objects):
+        bpy.app.timers.register(export_dirty_objects, first_interval=scene.jbeam.watch_delay)
+
+
+# Timer callback, returns the seconds until the next call or None when there is nothing left to do
+def export_dirty_objects():
+    scene = bpy.context.scene
+
+    if not scene.jbeam.watch_mode:
+        dirty_objects.clear()
+        return None
+
+    collect_exports()
+
+    delay = scene.jbeam.watch_delay
+    now = time.monotonic()
+    ready = []
+
+    for name, changed in list(dirty_objects.items()):
+        obj = scene.objects.get(name)
+
+        if obj is None or obj.mode == 'EDIT':
+            del dirty_objects[name]
+        elif now - changed >= delay and name not in running_exports:
+            del dirty_objects[name]
+            ready.append(obj)
+
+    if ready:
+        export_objects(scene, ready)
+
+    if dirty_objects:
+        return max(0.1, min(delay - (now - changed) for changed in dirty_objects.values()))
+
+    # Polls the exports still running in the background
+    if running_exports:
+        return 0.2
+
+    return None
+
+
+def export_objects(scene, objects):
+    global executor
+
+    directory = get_export_directory(scene)
+
+    if directory is None:
+        print('JBeam watch: no export folder set, or the .blend file is not saved yet')
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    depsgraph = bpy.context.evaluated_depsgraph_get() if scene.jbeam.apply_modifiers else None
+
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1)
+
+    for obj in objects:
+        filename = obj.name if '.jbeam' in obj.name else obj.name + '.jbeam'
+        filepath = os.path.join(directory, filename)
+
+        # The export operator is still writing the file, tried again later
+        if export_jbeam.is_being_written(filepath):
+            dirty_objects[obj.name] = time.monotonic()
+            continue
+
+        settings = export_jbeam.get_export_settings(bpy.context, obj)
+
+        try:
+            if settings.beams and settings.face_diagonals and not settings.triangulate_ngons:
+                with export_jbeam.get_export_mesh(obj, depsgraph) as mesh:
+                    ngons = export_jbeam.get_ngons(mesh)
+
+                if len(ngons):
+                    print('JBeam watch: %s contains Ngons, not exported. Ngon polygon indices: %s' % (
+                        obj.name, core.format_indices(ngons)))
+                    continue
+
+            part = export_jbeam.get_jbeam_part(obj, settings, depsgraph=depsgraph)
+        except Exception as e:
+            print('JBeam watch: could not read %s: %s' % (obj.name, e))
+            continue
+
+        fingerprint = cache.get_part_fingerprint(part, sorted(settings.sections.items()), print_version())
+
+        if exported_fingerprints.get(filepath) == fingerprint and os.path.isfile(filepath):
+            continue
+
+        exported_fingerprints[filepath] = fingerprint
+        running_exports[obj.name] = (filepath, export_jbeam.submit_export(executor, part, filepath, settings))
+
+
+# Reports the exports finished in the background
+def collect_exports():
+    for name, (filepath, future) in list(running_exports.items()):
+        if not future.done():
+            continue
+
+        del running_exports[name]
+
+        if future.exception() is not None:
+            print('JBeam watch: could not export %s: %s' % (name, future.exception()))
+            exported_fingerprints.pop(filepath, None)
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post_handler)
+
+
+def unregister():
+    global executor
+
+    if depsgraph_update_post_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post_handler)
+
+    if bpy.app.timers.is_registered(export_dirty_objects):
+        bpy.app.timers.unregister(export_dirty_objects)
+
+    if executor is not None:
+        executor.shutdown(wait=True)
+        executor = None
+
+    dirty_objects.clear()
+    running_exports.clear()
+    exported_fingerprints.clear()
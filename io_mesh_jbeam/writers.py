@@ -0,0 +1,81 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Script copyright (C) Thomas PORTASSAU (50thomatoes50) & Julien VANELIAN (Distrikt64/Juju)
+
+# <pep8-80 compliant>
+
+# Writer backends for the text produced by core.iter_sections().
+# Like core.py, this module does not depend on bpy.
+
+# Size (in characters) of the blocks written by the chunked writer
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class BufferedWriter(object):
+    # Assembles each section in memory and writes it with a single call
+    def __init__(self, file):
+        self.file = file
+        self.written = 0
+
+    def write(self, sections):
+        for section in sections:
+            text = ''.join(section)
+            self.file.write(text)
+            self.written += len(text)
+
+
+class ChunkedWriter(object):
+    # Streams sections in blocks of about `chunk_size` characters,
+    # memory use stays bounded whatever the size of the part
+    def __init__(self, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.written = 0
+
+    def write(self, sections):
+        pending = []
+        pending_size = 0
+
+        for section in sections:
+            for text in section:
+                pending.append(text)
+                pending_size += len(text)
+
+                if pending_size >= self.chunk_size:
+                    self.flush_pending(pending)
+                    pending = []
+                    pending_size = 0
+
+        self.flush_pending(pending)
+
+    def flush_pending(self, pending):
+        if pending:
+            text = ''.join(pending)
+            self.file.write(text)
+            self.written += len(text)
+
+
+WRITERS = {
+    'buffered': BufferedWriter,
+    'chunked': ChunkedWriter,
+}
+
+
+def get_writer(mode, file):
+    return WRITERS[mode](file)